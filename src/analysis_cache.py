@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional, Tuple
+
+import chess
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.path.join(CURRENT_DIR, "..", "analysis_cache.sqlite")
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    entries: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self):
+        return f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%}), {self.entries} entries"
+
+
+def normalize_fen(fen: str) -> str:
+    """
+    Placement, side to move, castling rights and en passant square of a FEN, without the move
+    counters. The en passant square is kept only when a capture is actually possible, so the same
+    position reached by different move orders gets the same key.
+    """
+    return " ".join(chess.Board(fen).fen(en_passant="legal").split()[:4])
+
+
+class AnalysisCache:
+    """
+    Engine results kept in an SQLite file across sessions, keyed by normalized FEN. Only the
+    deepest result of a position is stored, and it also answers requests for any shallower depth.
+    Once the cache holds more than max_entries positions, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # The engine is called from worker threads, so the connection is shared behind a lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analysis (
+                fen TEXT PRIMARY KEY,
+                depth INTEGER NOT NULL,
+                move TEXT,
+                score INTEGER,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS analysis_last_used ON analysis (last_used)")
+        self.connection.commit()
+        self.entries = self.connection.execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+
+    def get(self, fen: str, depth: int) -> Optional[Tuple[Optional[str], Optional[int]]]:
+        """
+        (move, score) stored for the position at depth or deeper, None on a miss.
+        """
+        key = normalize_fen(fen)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT move, score FROM analysis WHERE fen = ? AND depth >= ?", (key, depth)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.connection.execute("UPDATE analysis SET last_used = ? WHERE fen = ?", (time.time(), key))
+            self.connection.commit()
+            return row
+
+    def put(self, fen: str, depth: int, move: Optional[str], score: Optional[int]):
+        """
+        Store a result, unless the position already has one from a deeper search.
+        """
+        key = normalize_fen(fen)
+        with self.lock:
+            row = self.connection.execute("SELECT depth FROM analysis WHERE fen = ?", (key,)).fetchone()
+            if row is not None and row[0] > depth:
+                return
+
+            self.connection.execute(
+                "INSERT OR REPLACE INTO analysis (fen, depth, move, score, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, depth, move, score, time.time()),
+            )
+            if row is None:
+                self.entries += 1
+                if self.entries > self.max_entries:
+                    self._evict(self.entries - self.max_entries)
+            self.connection.commit()
+
+    def _evict(self, count: int):
+        self.connection.execute(
+            "DELETE FROM analysis WHERE fen IN (SELECT fen FROM analysis ORDER BY last_used LIMIT ?)", (count,)
+        )
+        self.entries -= count
+
+    def stats(self) -> CacheStats:
+        return CacheStats(hits=self.hits, misses=self.misses, entries=self.entries)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,86 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, NamedTuple, Optional
+
+
+class BackgroundRequest(NamedTuple):
+    position_key: int  # Zobrist key of the position the request was made for
+    future: Future
+
+
+class BackgroundTasks:
+    """
+    Runs slow calls (engine searches, LLM explanations) on worker threads so that the
+    pygame loop never waits for them. There is at most one request per purpose ("hint",
+    "enemy", ...), tagged with the position it was made for; the UI polls its future
+    every frame, and requests for a position that is no longer on the board are cancelled.
+    """
+
+    def __init__(self, workers: int = 1, name: str = "background"):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self.requests: Dict[str, BackgroundRequest] = {}
+        self.lock = threading.RLock()  # requests can also be made from the callbacks of other requests
+
+    def request(self, purpose: str, position_key: int, function: Callable, *args) -> Future:
+        """
+        Start function(*args) in the background, unless the same request for this position is already there.
+        """
+        with self.lock:
+            current = self.requests.get(purpose)
+            if current is not None:
+                if current.position_key == position_key:
+                    return current.future
+                current.future.cancel()
+
+            future = self.executor.submit(function, *args)
+            request = BackgroundRequest(position_key, future)
+            self.requests[purpose] = request
+        future.add_done_callback(lambda done: self._report_failure(purpose, request))
+        return future
+
+    def _report_failure(self, purpose: str, request: BackgroundRequest):
+        # Failures of stale requests (such as a search stopped by a newer one) are expected
+        if self.requests.get(purpose) is request and not request.future.cancelled() and request.future.exception():
+            print(f"Background {purpose} request failed: {request.future.exception()!r}")
+
+    def get(self, purpose: str, position_key: int) -> Optional[Future]:
+        request = self.requests.get(purpose)
+        if request is None or request.position_key != position_key:
+            return None
+        return request.future
+
+    def pop(self, purpose: str) -> Optional[Future]:
+        with self.lock:
+            request = self.requests.pop(purpose, None)
+        return request.future if request else None
+
+    @staticmethod
+    def result(future: Future):
+        """
+        Result of a finished future, None if it failed.
+        """
+        return None if future.cancelled() or future.exception() else future.result()
+
+    def is_running(self) -> bool:
+        return any(not request.future.done() for request in self.requests.values())
+
+    def cancel_stale(self, position_key: int):
+        """
+        Drop the requests made for any other position. Requests that have not started are cancelled;
+        one already running finishes in the background and its result is ignored.
+        """
+        with self.lock:
+            for purpose, request in list(self.requests.items()):
+                if request.position_key != position_key:
+                    request.future.cancel()
+                    del self.requests[purpose]
+
+    def cancel_all(self):
+        with self.lock:
+            for request in self.requests.values():
+                request.future.cancel()
+            self.requests.clear()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
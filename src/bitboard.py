@@ -0,0 +1,596 @@
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from evaluation import PIECE_SQUARE_SCORES
+from zobrist import BLACK_TO_MOVE_KEY, CASTLING_KEYS, EP_FILE_KEYS, PIECE_KEYS
+
+WHITE = 0
+BLACK = 1
+COLOR_NAMES = ["white", "black"]
+
+PAWN = 1
+KNIGHT = 2
+BISHOP = 3
+ROOK = 4
+QUEEN = 5
+KING = 6
+PIECE_NAMES = [None, "Pawn", "Knight", "Bishop", "Rook", "Queen", "King"]
+PIECE_SYMBOLS = ".pnbrqk"
+PROMOTION_TYPES = [QUEEN, ROOK, BISHOP, KNIGHT]
+
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+CASTLING_SYMBOLS = [(WHITE_KINGSIDE, "K"), (WHITE_QUEENSIDE, "Q"), (BLACK_KINGSIDE, "k"), (BLACK_QUEENSIDE, "q")]
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# Squares are numbered like python-chess: a1 = 0, b1 = 1, ..., h8 = 63
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_3 = RANK_1 << 16
+RANK_6 = RANK_1 << 40
+RANK_8 = RANK_1 << 56
+ALL_SQUARES = (1 << 64) - 1
+LIGHT_SQUARES = 0x55AA55AA55AA55AA
+DARK_SQUARES = ALL_SQUARES ^ LIGHT_SQUARES
+SQUARE_NAMES = [f"{file}{rank}" for rank in "12345678" for file in "abcdefgh"]
+SQUARE_INDICES = {name: index for index, name in enumerate(SQUARE_NAMES)}
+
+# Moves are packed into 16 bits: from square (bits 0-5), to square (6-11), promotion piece
+# type (12-14) and a flag (15) on castling and en passant, which also move a second piece
+MOVE_SPECIAL = 1 << 15
+
+
+def encode_move(from_square: int, to_square: int, promotion: int = 0, special: bool = False) -> int:
+    return from_square | to_square << 6 | promotion << 12 | (MOVE_SPECIAL if special else 0)
+
+
+def decode_move(move: int) -> Tuple[int, int, int]:
+    """
+    Split a packed move into (from_square, to_square, promotion).
+    """
+    return move & 63, move >> 6 & 63, move >> 12 & 7
+
+
+def lsb(bb: int) -> int:
+    return (bb & -bb).bit_length() - 1
+
+
+def iter_squares(bb: int):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def _leaper_attacks(deltas) -> List[int]:
+    table = []
+    for square in range(64):
+        file, rank = square & 7, square >> 3
+        attacks = 0
+        for df, dr in deltas:
+            if 0 <= file + df < 8 and 0 <= rank + dr < 8:
+                attacks |= 1 << ((rank + dr) * 8 + file + df)
+        table.append(attacks)
+    return table
+
+
+def _rays(df, dr) -> List[int]:
+    table = []
+    for square in range(64):
+        file, rank = (square & 7) + df, (square >> 3) + dr
+        ray = 0
+        while 0 <= file < 8 and 0 <= rank < 8:
+            ray |= 1 << (rank * 8 + file)
+            file += df
+            rank += dr
+        table.append(ray)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_attacks([(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)])
+KING_ATTACKS = _leaper_attacks([(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)])
+# PAWN_ATTACKS[color][square] are the squares a pawn of that color on square attacks
+PAWN_ATTACKS = [_leaper_attacks([(-1, 1), (1, 1)]), _leaper_attacks([(-1, -1), (1, -1)])]
+
+# (rays, increasing) pairs: the first blocker is the lowest set bit on increasing rays
+ROOK_RAYS = [(_rays(0, 1), True), (_rays(1, 0), True), (_rays(0, -1), False), (_rays(-1, 0), False)]
+BISHOP_RAYS = [(_rays(1, 1), True), (_rays(-1, 1), True), (_rays(1, -1), False), (_rays(-1, -1), False)]
+
+
+
+def _between_and_line_tables():
+    between = [[0] * 64 for _ in range(64)]
+    line = [[0] * 64 for _ in range(64)]
+    for df, dr in [(0, 1), (1, 0), (1, 1), (-1, 1), (0, -1), (-1, 0), (-1, -1), (1, -1)]:
+        forward, backward = _rays(df, dr), _rays(-df, -dr)
+        for square in range(64):
+            full_line = forward[square] | backward[square] | 1 << square
+            for target in iter_squares(forward[square]):
+                between[square][target] = forward[square] & backward[target]
+                line[square][target] = full_line
+    return between, line
+
+
+# BETWEEN[a][b] are the squares strictly between two aligned squares, LINE[a][b] the whole line through them
+BETWEEN, LINE = _between_and_line_tables()
+
+# Castling rights that survive a move touching the square (king and rook home squares)
+CASTLING_MASKS = [0xF] * 64
+CASTLING_MASKS[0] = ~WHITE_QUEENSIDE & 0xF
+CASTLING_MASKS[4] = ~(WHITE_KINGSIDE | WHITE_QUEENSIDE) & 0xF
+CASTLING_MASKS[7] = ~WHITE_KINGSIDE & 0xF
+CASTLING_MASKS[56] = ~BLACK_QUEENSIDE & 0xF
+CASTLING_MASKS[60] = ~(BLACK_KINGSIDE | BLACK_QUEENSIDE) & 0xF
+CASTLING_MASKS[63] = ~BLACK_KINGSIDE & 0xF
+
+
+def _slider_attacks(square: int, occupied: int, rays) -> int:
+    attacks = 0
+    for table, increasing in rays:
+        ray = table[square]
+        blockers = ray & occupied
+        if blockers:
+            first = lsb(blockers) if increasing else blockers.bit_length() - 1
+            ray ^= table[first]
+        attacks |= ray
+    return attacks
+
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    return _slider_attacks(square, occupied, BISHOP_RAYS)
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    return _slider_attacks(square, occupied, ROOK_RAYS)
+
+
+def queen_attacks(square: int, occupied: int) -> int:
+    return _slider_attacks(square, occupied, BISHOP_RAYS) | _slider_attacks(square, occupied, ROOK_RAYS)
+
+
+class PositionUndo(NamedTuple):
+    move: int
+    captured: int
+    castling: int
+    ep_square: Optional[int]
+    halfmove_clock: int
+    attacks: List[Optional[int]]
+    key: int
+
+
+class Position:
+    """
+    Bitboard representation of a chess position.
+    Moves are packed 16-bit integers (see encode_move) and move lists are array('H').
+    """
+
+    def __init__(self):
+        self.pieces = [[0] * 7, [0] * 7]  # pieces[color][piece_type]
+        self.occupied = [0, 0]
+        self.mailbox = [0] * 64  # piece_type | color << 3, 0 when empty
+        self.turn = WHITE
+        self.castling = 0
+        self.ep_square = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self._attacks = [None, None]  # attack maps of the current position, restored on unmake
+        self.key = 0  # Zobrist hash of pieces, side to move, castling rights and en passant
+        self.score = 0  # material plus piece-square score in centipawns, positive for white
+        self.history = []  # keys of the positions before each move played, for repetition detection
+
+    @classmethod
+    def from_fen(cls, fen: str = STARTING_FEN) -> "Position":
+        position = cls()
+        fields = fen.split()
+        for rank_index, rank in enumerate(fields[0].split("/")):
+            file = 0
+            for char in rank:
+                if char.isdigit():
+                    file += int(char)
+                    continue
+                color = WHITE if char.isupper() else BLACK
+                position._put((7 - rank_index) * 8 + file, color, PIECE_SYMBOLS.index(char.lower()))
+                file += 1
+
+        position.turn = WHITE if fields[1] == "w" else BLACK
+        for right, symbol in CASTLING_SYMBOLS:
+            if symbol in fields[2]:
+                position.castling |= right
+        position.ep_square = None if fields[3] == "-" else SQUARE_INDICES[fields[3]]
+        if len(fields) > 5:
+            position.halfmove_clock = int(fields[4])
+            position.fullmove_number = int(fields[5])
+        position.key ^= position._state_key()
+        return position
+
+    def fen(self) -> str:
+        ranks = []
+        for rank in range(7, -1, -1):
+            row = ""
+            empty = 0
+            for file in range(8):
+                code = self.mailbox[rank * 8 + file]
+                if not code:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                symbol = PIECE_SYMBOLS[code & 7]
+                row += symbol.upper() if code >> 3 == WHITE else symbol
+            if empty:
+                row += str(empty)
+            ranks.append(row)
+
+        castling = "".join(symbol for right, symbol in CASTLING_SYMBOLS if self.castling & right) or "-"
+        ep_square = "-" if self.ep_square is None else SQUARE_NAMES[self.ep_square]
+        turn = "w" if self.turn == WHITE else "b"
+        return f"{'/'.join(ranks)} {turn} {castling} {ep_square} {self.halfmove_clock} {self.fullmove_number}"
+
+    def __str__(self) -> str:
+        """
+        Text diagram, rank 8 first, in the same layout as str(chess.Board).
+        """
+        rows = []
+        for rank in range(7, -1, -1):
+            symbols = []
+            for file in range(8):
+                code = self.mailbox[rank * 8 + file]
+                symbol = PIECE_SYMBOLS[code & 7]
+                symbols.append(symbol.upper() if code and code >> 3 == WHITE else symbol)
+            rows.append(" ".join(symbols))
+        return "\n".join(rows)
+
+    def piece_at(self, square: int) -> Optional[Tuple[int, int]]:
+        """
+        Return the (color, piece_type) on the square, or None if it is empty.
+        """
+        code = self.mailbox[square]
+        return (code >> 3, code & 7) if code else None
+
+    def king_square(self, color: int) -> Optional[int]:
+        king = self.pieces[color][KING]
+        return lsb(king) if king else None
+
+    def _state_key(self) -> int:
+        """
+        Hash of everything but the pieces. The en passant file only counts when
+        a pawn can actually capture there, so transpositions keep the same key.
+        """
+        key = CASTLING_KEYS[self.castling]
+        if self.turn == BLACK:
+            key ^= BLACK_TO_MOVE_KEY
+        if self.ep_square is not None and PAWN_ATTACKS[self.turn ^ 1][self.ep_square] & self.pieces[self.turn][PAWN]:
+            key ^= EP_FILE_KEYS[self.ep_square & 7]
+        return key
+
+    def compute_key(self) -> int:
+        """
+        Zobrist key computed from scratch, for checking the incremental one.
+        """
+        key = self._state_key()
+        for square, code in enumerate(self.mailbox):
+            if code:
+                key ^= PIECE_KEYS[code][square]
+        return key
+
+    def compute_score(self) -> int:
+        """
+        Material and piece-square score computed from scratch, for checking the incremental one.
+        """
+        return sum(PIECE_SQUARE_SCORES[code][square] for square, code in enumerate(self.mailbox) if code)
+
+    def _put(self, square: int, color: int, piece_type: int):
+        bit = 1 << square
+        self.pieces[color][piece_type] |= bit
+        self.occupied[color] |= bit
+        self.mailbox[square] = piece_type | color << 3
+        self.key ^= PIECE_KEYS[piece_type | color << 3][square]
+        self.score += PIECE_SQUARE_SCORES[piece_type | color << 3][square]
+
+    def _remove(self, square: int):
+        code = self.mailbox[square]
+        bit = 1 << square
+        self.pieces[code >> 3][code & 7] ^= bit
+        self.occupied[code >> 3] ^= bit
+        self.mailbox[square] = 0
+        self.key ^= PIECE_KEYS[code][square]
+        self.score -= PIECE_SQUARE_SCORES[code][square]
+
+    def attacks(self, color: int) -> int:
+        """
+        Squares attacked by color, computed once per position. Sliders see
+        through the enemy king so that it cannot step back along a checking ray.
+        """
+        attacks = self._attacks[color]
+        if attacks is None:
+            attacks = self._attacks[color] = self._compute_attacks(color)
+        return attacks
+
+    def _compute_attacks(self, color: int) -> int:
+        pieces = self.pieces[color]
+        occupied = (self.occupied[WHITE] | self.occupied[BLACK]) & ~self.pieces[color ^ 1][KING]
+        pawns = pieces[PAWN]
+        if color == WHITE:
+            attacks = ((pawns << 7) & ~FILE_H | (pawns << 9) & ~FILE_A) & ALL_SQUARES
+        else:
+            attacks = (pawns >> 9) & ~FILE_H | (pawns >> 7) & ~FILE_A
+        for square in iter_squares(pieces[KNIGHT]):
+            attacks |= KNIGHT_ATTACKS[square]
+        for square in iter_squares(pieces[BISHOP] | pieces[QUEEN]):
+            attacks |= bishop_attacks(square, occupied)
+        for square in iter_squares(pieces[ROOK] | pieces[QUEEN]):
+            attacks |= rook_attacks(square, occupied)
+        for square in iter_squares(pieces[KING]):
+            attacks |= KING_ATTACKS[square]
+        return attacks
+
+    def repetitions(self) -> int:
+        """
+        How many times the current position has occurred, counting this one. Only positions
+        since the last capture or pawn move, with the same side to move, can be repeats.
+        """
+        count = 1
+        history = self.history
+        for ply in range(2, min(self.halfmove_clock, len(history)) + 1, 2):
+            if history[-ply] == self.key:
+                count += 1
+        return count
+
+    def is_fifty_moves(self) -> bool:
+        return self.halfmove_clock >= 100
+
+    def is_insufficient_material(self) -> bool:
+        """
+        Neither side can mate: bare kings, a single minor piece, or only bishops all on one square color.
+        """
+        white, black = self.pieces
+        if white[PAWN] or black[PAWN] or white[ROOK] or black[ROOK] or white[QUEEN] or black[QUEEN]:
+            return False
+        bishops = white[BISHOP] | black[BISHOP]
+        minors = white[KNIGHT] | black[KNIGHT] | bishops
+        if not minors & (minors - 1):
+            return True
+        if white[KNIGHT] or black[KNIGHT]:
+            return False
+        return not bishops & LIGHT_SQUARES or not bishops & DARK_SQUARES
+
+    def is_check(self, color: Optional[int] = None) -> bool:
+        color = self.turn if color is None else color
+        return bool(self.pieces[color][KING] & self.attacks(color ^ 1))
+
+    def checkers(self, color: Optional[int] = None) -> int:
+        """
+        Bitboard of the enemy pieces giving check to the king of color.
+        """
+        color = self.turn if color is None else color
+        king_square = self.king_square(color)
+        if king_square is None or not self.is_check(color):
+            return 0
+
+        enemy = self.pieces[color ^ 1]
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        return (
+            KNIGHT_ATTACKS[king_square] & enemy[KNIGHT]
+            | PAWN_ATTACKS[color][king_square] & enemy[PAWN]
+            | bishop_attacks(king_square, occupied) & (enemy[BISHOP] | enemy[QUEEN])
+            | rook_attacks(king_square, occupied) & (enemy[ROOK] | enemy[QUEEN])
+        )
+
+    def pins(self, color: int, king_square: int) -> Dict[int, int]:
+        """
+        Map every piece of color pinned to its king to the line it may still move along.
+        """
+        pins = {}
+        enemy = self.pieces[color ^ 1]
+        own = self.occupied[color]
+        occupied = own | self.occupied[color ^ 1]
+        snipers = (
+            rook_attacks(king_square, 0) & (enemy[ROOK] | enemy[QUEEN])
+            | bishop_attacks(king_square, 0) & (enemy[BISHOP] | enemy[QUEEN])
+        )
+        for sniper in iter_squares(snipers):
+            blockers = BETWEEN[king_square][sniper] & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pins[lsb(blockers)] = LINE[king_square][sniper]
+        return pins
+
+    def is_castling(self, move: int) -> bool:
+        return bool(move & MOVE_SPECIAL) and self.mailbox[move & 63] & 7 == KING
+
+    def is_en_passant(self, move: int) -> bool:
+        return bool(move & MOVE_SPECIAL) and self.mailbox[move & 63] & 7 == PAWN
+
+    def legal_moves(self, color: Optional[int] = None, captures_only: bool = False) -> array:
+        """
+        Generate the legal moves of color (the side to move by default) from the
+        checkers, pins and enemy attack map, without playing any move.
+        With captures_only, only captures and promotions are generated (for quiescence search).
+        """
+        color = self.turn if color is None else color
+        moves = array("H")
+        pieces = self.pieces[color]
+        own = self.occupied[color]
+        enemy = self.occupied[color ^ 1]
+        occupied = own | enemy
+        empty = ~occupied & ALL_SQUARES
+        king_square = self.king_square(color)
+        enemy_attacks = self.attacks(color ^ 1)
+        landing_mask = enemy if captures_only else ALL_SQUARES
+
+        if king_square is not None:
+            for to_square in iter_squares(KING_ATTACKS[king_square] & ~own & ~enemy_attacks & landing_mask):
+                moves.append(king_square | to_square << 6)
+
+        checkers = self.checkers(color)
+        if checkers & (checkers - 1):
+            # Double check: only the king can move
+            return moves
+
+        # Squares a non-king move must land on: anywhere, or on the checker and the ray it checks along
+        targets_mask = ALL_SQUARES
+        if checkers:
+            targets_mask = checkers | BETWEEN[king_square][lsb(checkers)]
+        pins = self.pins(color, king_square) if king_square is not None else {}
+
+        # Pawns, generated set-wise by shifting the whole pawn bitboard
+        pawns = pieces[PAWN]
+        if color == WHITE:
+            single = (pawns << 8) & empty
+            double = ((single & RANK_3) << 8) & empty
+            left = (pawns << 7) & ~FILE_H & enemy
+            right = (pawns << 9) & ~FILE_A & enemy
+            forward, last_rank = 8, RANK_8
+        else:
+            single = (pawns >> 8) & empty
+            double = ((single & RANK_6) >> 8) & empty
+            left = (pawns >> 9) & ~FILE_H & enemy
+            right = (pawns >> 7) & ~FILE_A & enemy
+            forward, last_rank = -8, RANK_1
+        if captures_only:
+            single &= last_rank
+            double = 0
+
+        for targets, delta in ((single, forward), (double, 2 * forward), (left, forward - 1), (right, forward + 1)):
+            for to_square in iter_squares(targets & targets_mask):
+                from_square = to_square - delta
+                if from_square in pins and not pins[from_square] >> to_square & 1:
+                    continue
+                if 1 << to_square & last_rank:
+                    for promotion in PROMOTION_TYPES:
+                        moves.append(from_square | to_square << 6 | promotion << 12)
+                else:
+                    moves.append(from_square | to_square << 6)
+
+        if self.ep_square is not None and color == self.turn:
+            # Rare enough that playing the move is the simplest way to catch every discovered check
+            for from_square in iter_squares(PAWN_ATTACKS[color ^ 1][self.ep_square] & pawns):
+                move = from_square | self.ep_square << 6 | MOVE_SPECIAL
+                undo = self.make_move(move)
+                if not self.is_check(color):
+                    moves.append(move)
+                self.unmake_move(undo)
+
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN):
+            for from_square in iter_squares(pieces[piece_type]):
+                if piece_type == KNIGHT:
+                    attacks = KNIGHT_ATTACKS[from_square]
+                elif piece_type == BISHOP:
+                    attacks = bishop_attacks(from_square, occupied)
+                elif piece_type == ROOK:
+                    attacks = rook_attacks(from_square, occupied)
+                else:
+                    attacks = queen_attacks(from_square, occupied)
+                attacks &= ~own & targets_mask & landing_mask
+                if from_square in pins:
+                    attacks &= pins[from_square]
+                for to_square in iter_squares(attacks):
+                    moves.append(from_square | to_square << 6)
+
+        if not checkers and not captures_only:
+            moves.extend(self._castling_moves(color, occupied, enemy_attacks))
+        return moves
+
+    def _castling_moves(self, color: int, occupied: int, enemy_attacks: int) -> List[int]:
+        moves = []
+        if color == WHITE:
+            king_square, kingside, queenside = 4, WHITE_KINGSIDE, WHITE_QUEENSIDE
+        else:
+            king_square, kingside, queenside = 60, BLACK_KINGSIDE, BLACK_QUEENSIDE
+
+        if not self.castling & (kingside | queenside) or self.mailbox[king_square] != KING | color << 3:
+            return moves
+
+        if (
+            self.castling & kingside
+            and self.mailbox[king_square + 3] == ROOK | color << 3
+            and not occupied & (0b11 << (king_square + 1))
+            and not enemy_attacks & (0b11 << (king_square + 1))
+        ):
+            moves.append(king_square | (king_square + 2) << 6 | MOVE_SPECIAL)
+        if (
+            self.castling & queenside
+            and self.mailbox[king_square - 4] == ROOK | color << 3
+            and not occupied & (0b111 << (king_square - 3))
+            and not enemy_attacks & (0b11 << (king_square - 2))
+        ):
+            moves.append(king_square | (king_square - 2) << 6 | MOVE_SPECIAL)
+        return moves
+
+    def make_move(self, move: int) -> PositionUndo:
+        from_square, to_square, promotion = move & 63, move >> 6 & 63, move >> 12 & 7
+        special = move & MOVE_SPECIAL
+        code = self.mailbox[from_square]
+        color, piece_type = code >> 3, code & 7
+        captured = self.mailbox[to_square]
+        undo = PositionUndo(move, captured, self.castling, self.ep_square, self.halfmove_clock, self._attacks, self.key)
+        self.history.append(self.key)
+        self._attacks = [None, None]
+        self.key ^= self._state_key()
+
+        if captured:
+            self._remove(to_square)
+        elif special and piece_type == PAWN:
+            self._remove(to_square - 8 if color == WHITE else to_square + 8)
+
+        self._remove(from_square)
+        self._put(to_square, color, promotion or piece_type)
+
+        if special and piece_type == KING:
+            if to_square > from_square:
+                self._remove(from_square + 3)
+                self._put(from_square + 1, color, ROOK)
+            else:
+                self._remove(from_square - 4)
+                self._put(from_square - 1, color, ROOK)
+
+        self.castling &= CASTLING_MASKS[from_square] & CASTLING_MASKS[to_square]
+        if piece_type == PAWN and abs(to_square - from_square) == 16:
+            self.ep_square = (from_square + to_square) // 2
+        else:
+            self.ep_square = None
+        if piece_type == PAWN or captured:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if self.turn == BLACK:
+            self.fullmove_number += 1
+        self.turn ^= 1
+        self.key ^= self._state_key()
+        return undo
+
+    def unmake_move(self, undo: PositionUndo):
+        move = undo.move
+        from_square, to_square, promotion = move & 63, move >> 6 & 63, move >> 12 & 7
+        special = move & MOVE_SPECIAL
+        code = self.mailbox[to_square]
+        color = code >> 3
+        piece_type = PAWN if promotion else code & 7
+
+        self._remove(to_square)
+        self._put(from_square, color, piece_type)
+        if undo.captured:
+            self._put(to_square, undo.captured >> 3, undo.captured & 7)
+        elif special and piece_type == PAWN:
+            self._put(to_square - 8 if color == WHITE else to_square + 8, color ^ 1, PAWN)
+
+        if special and piece_type == KING:
+            if to_square > from_square:
+                self._remove(from_square + 1)
+                self._put(from_square + 3, color, ROOK)
+            else:
+                self._remove(from_square - 1)
+                self._put(from_square - 4, color, ROOK)
+
+        self.castling = undo.castling
+        self.ep_square = undo.ep_square
+        self.halfmove_clock = undo.halfmove_clock
+        self._attacks = undo.attacks
+        self.turn ^= 1
+        if self.turn == BLACK:
+            self.fullmove_number -= 1
+        self.key = undo.key
+        self.history.pop()
@@ -1,189 +1,202 @@
-import sys
-from typing import List
-from const import COLS, ROWS
-from grid import Grid
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from bitboard import COLOR_NAMES, PROMOTION_TYPES, QUEEN, iter_squares
+from grid import Grid, MoveUndo
 from move import Move
-from pieces import Piece
-from pieces.queen import Queen
 from square import Square
 
 
+class BoardUndo(NamedTuple):
+    grid_undo: MoveUndo
+
+
+class BoardAnalysis(NamedTuple):
+    # Legal moves of the side to move as {(from_index, to_index): packed move}
+    legal_moves: Dict[Tuple[int, int], int]
+    checks: Dict[str, List[Move]]  # checker -> king moves of each color
+    check_squares: Dict[str, List[Square]]  # checkers, check rays and king of each color
+    is_checkmate: bool
+    is_stalemate: bool
+    draw_reason: Optional[str]  # why the game is drawn, if it is
+
+
 class Board:
     def __init__(self, play_as_white=True, grid=None):
         self.grid = grid or Grid(play_as_white)
-        self.turn = "white"
-        self.checks = {"white": [], "black": []}
         self.moves = []
         self.is_game_over = False
-        self.possible_moves = self._get_all_possible_moves(self.turn)
-
-    def move(self, row, col, piece):
-        moves = []
-        
-        for possible_move in self.possible_moves:
-            if (
-                possible_move.target_row == row
-                and possible_move.target_col == col
-                and piece == possible_move.piece
-            ):
-                moves.append(possible_move)
-
-        if not moves:
+        # Analysis of the current position, computed on first use and dropped by every move and undo
+        self._analysis: Optional[BoardAnalysis] = None
+
+    @property
+    def turn(self) -> str:
+        # The side to move is kept by the Position only
+        return COLOR_NAMES[self.grid.position.turn]
+
+    @property
+    def analysis(self) -> BoardAnalysis:
+        if self._analysis is None:
+            self._analysis = self._analyze()
+        return self._analysis
+
+    @property
+    def possible_moves(self) -> Dict[Tuple[int, int], int]:
+        # Move objects are only built for the move being played or shown
+        return self.analysis.legal_moves
+
+    def _analyze(self) -> BoardAnalysis:
+        legal_moves = self.get_legal_moves_index()
+        checks = {color: self._find_checks(color) for color in COLOR_NAMES}
+        check_squares = {
+            color: [square for move in checks[color] for square in self.grid.get_squares_between(move)]
+            for color in COLOR_NAMES
+        }
+        in_check = bool(checks[self.turn])
+        is_checkmate = in_check and not legal_moves
+        is_stalemate = not in_check and not legal_moves
+        if is_checkmate:
+            # Mate ends the game, even on the move that reaches the fifty-move limit
+            draw_reason = None
+        else:
+            draw_reason = "stalemate" if is_stalemate else self._find_draw_reason()
+        return BoardAnalysis(
+            legal_moves=legal_moves,
+            checks=checks,
+            check_squares=check_squares,
+            is_checkmate=is_checkmate,
+            is_stalemate=is_stalemate,
+            draw_reason=draw_reason,
+        )
+
+    def _find_draw_reason(self) -> Optional[str]:
+        position = self.grid.position
+        if position.is_insufficient_material():
+            return "insufficient material"
+        if position.is_fifty_moves():
+            return "fifty-move rule"
+        if position.repetitions() >= 3:
+            return "threefold repetition"
+        return None
+
+    def move(self, row, col, piece, promotion=QUEEN):
+        """
+        Play piece to (row, col) if that is legal. A pawn reaching the last row
+        becomes the promotion piece type, a queen unless told otherwise.
+        """
+        from_square = self.grid.get_square_by_piece(piece)
+        if from_square is None:
+            return
+
+        to_square = self.grid.get_square_by_row_and_col(row, col)
+        if to_square.index is None:
+            # Dropped outside the board
             return
 
-        move = moves[0]
-        self.grid.move_piece(move)
+        possible_move = self.possible_moves.get((from_square.index, to_square.index))
+        if possible_move is None:
+            return
+        if possible_move >> 12 & 7 and promotion in PROMOTION_TYPES:
+            # The index holds the queen promotion; the other promotions to the same square are legal with it
+            possible_move = possible_move & ~(7 << 12) | promotion << 12
+
+        # Taken from the legal moves of the position, so there is no need to validate it again
+        move = self.grid.to_move(possible_move)
+        self.grid.make_move(move)
+        self._analysis = None
+
+        self.moves.append(move)
+        self._update_game_state()
+
+    def make_move(self, move: Move) -> BoardUndo:
+        """
+        Play a move in place, without validating it, and return an undo token.
+        Used by the search so that it can walk the tree on a single board.
+        """
+        grid_undo = self.grid.make_move(move)
+        self._analysis = None
         self.moves.append(move)
-        move.piece.add_move(move)
-        self._verify_promotion()
-        self._switch_turn()
-
-    def _get_all_possible_moves(self, color):
-        moves = []
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece: Piece = self.grid.get_square_by_row_and_col(row, col).piece
-                if piece and piece.color == color:
-                    moves.extend(piece.get_possible_moves(row, col, self.grid))
-        
-        return moves
-
-    def _switch_turn(self):
-        self.turn = "white" if self.turn == "black" else "black"
-        is_white_mate = self.is_check_mate("white")
-        is_black_mate = self.is_check_mate("black")
-        if is_white_mate:
-            print("White is in checkmate")
+        return BoardUndo(grid_undo=grid_undo)
+
+    def unmake_move(self, undo: BoardUndo):
+        """
+        Revert a move played with make_move.
+        """
+        self.moves.pop()
+        self.grid.unmake_move(undo.grid_undo)
+        self._analysis = None
+
+    def _update_game_state(self):
+        analysis = self.analysis
+        if analysis.is_checkmate:
+            print(f"{self.turn.capitalize()} is in checkmate")
             self.is_game_over = True
-            
-        if is_black_mate:
-            print("Black is in checkmate")
+
+        elif analysis.draw_reason:
+            print(f"Draw by {analysis.draw_reason}")
             self.is_game_over = True
-            
-        white_possible_moves = self.get_possible_moves_by_color("white")
-        black_possible_moves = self.get_possible_moves_by_color("black")
-        self.possible_moves = white_possible_moves + black_possible_moves
 
     def is_check_mate(self, color):
-        return self.is_king_in_check(color) and not self.get_possible_moves_by_color(color)
-
-    def get_possible_moves_by_color(self, color):
-        is_king_in_check = self.is_king_in_check(color)
-
-        if is_king_in_check:
-            return self._get_protective_moves(color)
-
-        safe_moves = []
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = self.grid.get_square_by_row_and_col(row, col)
-                if square.has_piece() and square.piece.color == color:
-                    piece = square.piece
-                    possible_moves = piece.get_possible_moves(row, col, self.grid)
-
-                    for move in possible_moves:
-                        # Simulate the move
-                        captured_piece = self.grid.get_square_by_row_and_col(
-                            move.target_row, move.target_col
-                        ).piece
-                        initial_square = self.grid.get_square_by_row_and_col(
-                            move.initial_row, move.initial_col
-                        )
-                        target_square = self.grid.get_square_by_row_and_col(
-                            move.target_row, move.target_col
-                        )
-
-                        target_square.piece = piece
-                        initial_square.piece = None
-
-                        if not self.is_king_in_check(color):
-                            safe_moves.append(move)
-
-                        # Undo the simulated move
-                        initial_square.piece = piece
-                        target_square.piece = captured_piece
-
-        return safe_moves
-
-    def _get_protective_moves(self, color):
-        protective_moves = []
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = self.grid.get_square_by_row_and_col(row, col)
-                if square.has_piece() and square.piece.color == color:
-                    piece = square.piece
-                    possible_moves = piece.get_possible_moves(row, col, self.grid)
-                    for move in possible_moves:
-                        captured_piece = self.grid.get_square_by_row_and_col(
-                            move.target_row, move.target_col
-                        ).piece
-                        initial_square = self.grid.get_square_by_row_and_col(
-                            move.initial_row, move.initial_col
-                        )
-                        target_square = self.grid.get_square_by_row_and_col(
-                            move.target_row, move.target_col
-                        )
-                        target_square.piece = piece
-                        initial_square.piece = None
-                        if not self.is_king_in_check(color):
-                            protective_moves.append(move)
-                        initial_square.piece = piece
-                        target_square.piece = captured_piece
-        return protective_moves
+        # Only the side to move can be mated
+        return color == self.turn and self.analysis.is_checkmate
+
+    def get_legal_moves(self, color) -> array:
+        """
+        Legal moves of color as packed moves, under-promotions included.
+        """
+        return self.grid.position.legal_moves(COLOR_NAMES.index(color))
+
+    def get_legal_moves_index(self) -> Dict[Tuple[int, int], int]:
+        """
+        Legal moves of the side to move keyed by (from_index, to_index). Promotions are
+        stored as the queen promotion; Board.move swaps in another piece when asked to.
+        """
+        return {
+            (move & 63, move >> 6 & 63): move
+            for move in self.get_legal_moves(self.turn)
+            if move >> 12 & 7 in (0, QUEEN)
+        }
+
+    def get_possible_moves_by_color(self, color) -> List[Move]:
+        return [self.grid.to_move(move) for move in self.get_legal_moves(color)]
 
     def is_king_in_check(self, color: str) -> bool:
-        enemy_color = "black" if color == "white" else "white"
-        king_square = self.grid.get_square_by_piece_name_and_color("King", color)
-        for move in self._get_all_possible_moves(enemy_color):
-            if (
-                king_square
-                and move.target_row == king_square.row
-                and move.target_col == king_square.col
-            ):
-                return True
-
-        return False
-
-    def _verify_promotion(self):
-        white_pawns = self.grid.get_squares_by_piece_name_and_color("Pawn", "white")
-        black_pawns = self.grid.get_squares_by_piece_name_and_color("Pawn", "black")
-        all_pawns = white_pawns + black_pawns
-        
-        for pawn_square in all_pawns:
-            if (
-                pawn_square.row == 0
-                or pawn_square.row == ROWS - 1
-            ):
-                existent_queens = self.grid.get_squares_by_piece_name_and_color("Queen", pawn_square.piece.color)
-                asset = "black_queen.png" if pawn_square.piece.color == "black" else "white_queen.png"
-                self.grid.squares[pawn_square.row][pawn_square.col].piece = Queen(id=len(existent_queens) + 1, color=pawn_square.piece.color, asset=asset, direction=pawn_square.piece.direction)
+        return bool(self.analysis.checks[color])
 
     def get_checks(self, color: str) -> List[Move]:
+        return self.analysis.checks[color]
+
+    def get_check_squares(self, color: str) -> List[Square]:
+        """
+        Squares to highlight for the checks against color: each checker, the ray it checks along and the king.
+        """
+        return self.analysis.check_squares[color]
+
+    def _find_checks(self, color: str) -> List[Move]:
         checks = []
-        enemy_color = "black" if color == "white" else "white"
-        king_square = self.grid.get_square_by_piece_name_and_color("King", color)
-        for move in self._get_all_possible_moves(enemy_color):
-            if (
-                move.target_row == king_square.row
-                and move.target_col == king_square.col
-            ):
-                checks.append(move)
+        position = self.grid.position
+        checkers = position.checkers(COLOR_NAMES.index(color))
+        if not checkers:
+            return checks
+
+        king_square = self.grid.squares_by_index[position.king_square(COLOR_NAMES.index(color))]
+        for checker_index in iter_squares(checkers):
+            checker_square = self.grid.squares_by_index[checker_index]
+            checks.append(
+                Move(
+                    initial_row=checker_square.row,
+                    initial_col=checker_square.col,
+                    target_row=king_square.row,
+                    target_col=king_square.col,
+                    piece=checker_square.piece,
+                    captured_piece=king_square.piece,
+                )
+            )
 
         return checks
 
-    def get_state(self):
+    def get_state(self) -> int:
         """
-        Retorna uma representação única do estado atual do tabuleiro.
-        Aqui, estamos criando uma tupla contendo a posição e o tipo das peças.
+        Zobrist key of the current position (pieces, side to move, castling
+        rights and en passant), kept up to date incrementally by the Position.
         """
-        state = []
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = self.grid.get_square_by_row_and_col(row, col)
-                if square.has_piece():
-                    piece = square.piece
-                    # Representação simples da peça como uma tupla (cor, tipo)
-                    state.append((row, col, piece.color, piece.__class__.__name__))
-                else:
-                    state.append((row, col, None))  # Nenhuma peça na posição
-        return tuple(state)  # Retorna uma tupla para ser usada como hashable
\ No newline at end of file
+        return self.grid.position.key
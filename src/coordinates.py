@@ -0,0 +1,62 @@
+from typing import Optional, Tuple
+from const import COLS, ROWS
+from bitboard import PIECE_SYMBOLS, SQUARE_INDICES, SQUARE_NAMES
+
+# Precomputed conversions between UCI names, square indices (a1 = 0, h8 = 63, as in the Position)
+# and grid (row, col) for both orientations, so that nothing has to search the grid for a square.
+# Tables with an orientation are indexed by play_as_white: False (0) for black, True (1) for white.
+# SQUARE_NAMES and SQUARE_INDICES come from bitboard, which needs them for FEN parsing.
+
+
+def _row_col(index: int, play_as_white: bool) -> Tuple[int, int]:
+    rank, file = index >> 3, index & 7
+    if play_as_white:
+        # Rank 8 at the top, files a to h from left to right
+        return ROWS - 1 - rank, file
+    # Rank 1 at the top, files h to a from left to right
+    return rank, COLS - 1 - file
+
+
+# ROW_COLS[play_as_white][index] -> (row, col)
+ROW_COLS = [[_row_col(index, play_as_white) for index in range(ROWS * COLS)] for play_as_white in (False, True)]
+
+# SQUARE_INDICES_BY_ROW_COL[play_as_white][row][col] -> index
+SQUARE_INDICES_BY_ROW_COL = [[[0] * COLS for _ in range(ROWS)] for _ in range(2)]
+for _play_as_white in (False, True):
+    for _index, (_row, _col) in enumerate(ROW_COLS[_play_as_white]):
+        SQUARE_INDICES_BY_ROW_COL[_play_as_white][_row][_col] = _index
+
+
+def square_index(row: int, col: int, play_as_white: bool) -> int:
+    return SQUARE_INDICES_BY_ROW_COL[play_as_white][row][col]
+
+
+def row_col(index: int, play_as_white: bool) -> Tuple[int, int]:
+    return ROW_COLS[play_as_white][index]
+
+
+def uci_to_row_col(uci: str, play_as_white: bool) -> Optional[Tuple[int, int]]:
+    """
+    Grid (row, col) of a square name such as "e4", or None if it is not a square.
+    """
+    index = SQUARE_INDICES.get(uci)
+    return None if index is None else ROW_COLS[play_as_white][index]
+
+
+def parse_uci_move(uci: str) -> Optional[Tuple[int, int, str]]:
+    """
+    Split a UCI move ("e2e4", "e7e8q") into (from_index, to_index, promotion symbol or "").
+    """
+    from_index = SQUARE_INDICES.get(uci[:2])
+    to_index = SQUARE_INDICES.get(uci[2:4])
+    if from_index is None or to_index is None:
+        return None
+    return from_index, to_index, uci[4:]
+
+
+def move_to_uci(move: int) -> str:
+    """
+    UCI notation of a packed move, the inverse of parse_uci_move.
+    """
+    promotion = move >> 12 & 7
+    return SQUARE_NAMES[move & 63] + SQUARE_NAMES[move >> 6 & 63] + (PIECE_SYMBOLS[promotion] if promotion else "")
@@ -15,11 +15,9 @@ class Dragger:
         self.initial_col = 0
 
     def update_blit(self, screen):
-        self.piece.update_asset_size(128)
-        img = pygame.image.load(self.piece.asset)
+        img = pygame.image.load(self.piece.get_asset(128))
         img_center = self.mouse_x, self.mouse_y
-        self.piece.texture_rect = img.get_rect(center=img_center)
-        screen.blit(img, self.piece.texture_rect)
+        screen.blit(img, img.get_rect(center=img_center))
 
     def update_mouse(self, pos):
         self.mouse_x, self.mouse_y = pos
@@ -33,7 +31,5 @@ class Dragger:
         self.dragging = True
 
     def undrag_piece(self):
-        if self.piece is not None:
-            self.piece.update_asset_size(80)
         self.piece = None
         self.dragging = False
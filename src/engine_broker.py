@@ -0,0 +1,165 @@
+import os
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from analysis_cache import normalize_fen
+from bitboard import WHITE, Position
+from coordinates import move_to_uci
+from stockfish import EngineResult, Stockfish
+
+PREFETCH_COUNT = int(os.getenv("STOCKFISH_PREFETCH_COUNT", "3"))  # predicted user moves analysed ahead
+PREFETCH_WORKERS = int(os.getenv("STOCKFISH_PREFETCH_WORKERS", "2"))  # at most this many prefetches at once
+
+
+def predict_moves(fen: str, best_move: Optional[str] = None, count: int = PREFETCH_COUNT) -> List[str]:
+    """
+    The count moves most likely to be played in the position, in UCI notation: the engine's best
+    move first, then the moves that leave the side to move with the best material and piece-square score.
+    """
+    position = Position.from_fen(fen)
+    sign = 1 if position.turn == WHITE else -1
+    scores = {}
+    for move in position.legal_moves():
+        undo = position.make_move(move)
+        scores[move_to_uci(move)] = sign * position.score
+        position.unmake_move(undo)
+
+    moves = sorted(scores, key=scores.get, reverse=True)
+    if best_move in scores:
+        moves.remove(best_move)
+        moves.insert(0, best_move)
+    return moves[:count]
+
+
+def play_uci(fen: str, uci: str) -> str:
+    position = Position.from_fen(fen)
+    for move in position.legal_moves():
+        if move_to_uci(move) == uci:
+            position.make_move(move)
+            return position.fen()
+    raise ValueError(f"Illegal move {uci} in {fen}")
+
+
+class EngineBroker:
+    """
+    Sits in front of Stockfish. Identical queries made at the same time share one engine call (and a
+    query made while a deeper one for the same position runs waits for that one), and while the user
+    is thinking the positions after their likely moves are analysed ahead, so that the enemy move and
+    the next hint usually come from the analysis cache.
+    """
+
+    def __init__(self, stockfish: Stockfish, prefetch_count: int = PREFETCH_COUNT, prefetch_workers: int = PREFETCH_WORKERS):
+        self.stockfish = stockfish
+        self.prefetch_count = prefetch_count
+        # Prefetches only use the engine when it can take another search: a local engine runs one at a time
+        self.concurrency = max(1, min(prefetch_workers, stockfish.concurrency))
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="prefetch")
+        self.prefetches: List[Future] = []
+        self.in_flight: Dict[Tuple[str, int], Future] = {}
+        self.active = 0  # engine calls running right now
+        self.condition = threading.Condition()
+        self.coalesced = 0
+
+    def analyse(self, fen: str, depth: int, ponder: bool = False) -> EngineResult:
+        """
+        Blocking analysis, shared with a running identical (or deeper) query if there is one.
+        """
+        key = normalize_fen(fen)
+        with self.condition:
+            future = self._find_in_flight(key, depth)
+            if future is not None and not future.running() and future.cancel():
+                # Still waiting for a prefetch slot: cheaper to run it right away than to wait
+                future = None
+            if future is None:
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self.in_flight[key, depth] = future
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
+
+        if owner:
+            return self._run(future, key, fen, depth, ponder)
+        try:
+            return future.result()
+        except (CancelledError, Exception):
+            # The shared query failed or was stopped (a local engine stops a search when asked for another one)
+            return self.stockfish.analyse(fen, depth, ponder)
+
+    def get_best_move(self, fen: str, depth: int, ponder: bool = False) -> Optional[str]:
+        return self.analyse(fen, depth, ponder).move
+
+    def prefetch_replies(self, fen: str, best_move: Optional[str], reply_depth: int, hint_depth: int):
+        """
+        Analyse ahead, in the background, the positions after the user's likely moves in fen: first the
+        engine's reply at reply_depth, then the position after that reply at hint_depth. Prefetches queued
+        for an earlier position and not started yet are dropped. Nothing is prefetched for an engine that
+        ponders: it spends this time on the expected line itself, and any other search would stop it.
+        """
+        self.cancel_prefetch()
+        if self.stockfish.ponders:
+            return
+        for move in predict_moves(fen, best_move, self.prefetch_count):
+            self._prefetch(play_uci(fen, move), reply_depth, hint_depth)
+
+    def _prefetch(self, fen: str, depth: int, next_depth: Optional[int] = None):
+        key = normalize_fen(fen)
+        with self.condition:
+            if self._find_in_flight(key, depth) is not None:
+                return
+            future = Future()
+            self.in_flight[key, depth] = future
+            self.prefetches.append(future)
+        self.prefetch_executor.submit(self._run_prefetch, future, key, fen, depth, next_depth)
+
+    def _run_prefetch(self, future: Future, key: str, fen: str, depth: int, next_depth: Optional[int]):
+        with self.condition:
+            self.condition.wait_for(lambda: self.active < self.stockfish.concurrency or future.cancelled())
+            if not future.set_running_or_notify_cancel():
+                return
+        try:
+            result = self._run(future, key, fen, depth)
+        except Exception:
+            return
+        if next_depth is not None and result.move:
+            with self.condition:
+                if future not in self.prefetches:
+                    return  # dropped by cancel_prefetch while it was running
+            self._prefetch(play_uci(fen, result.move), next_depth)
+
+    def _run(self, future: Future, key: str, fen: str, depth: int, ponder: bool = False) -> EngineResult:
+        with self.condition:
+            self.active += 1
+        try:
+            result = self.stockfish.analyse(fen, depth, ponder)
+            future.set_result(result)
+            return result
+        except BaseException as exception:
+            future.set_exception(exception)
+            raise
+        finally:
+            with self.condition:
+                self.active -= 1
+                if self.in_flight.get((key, depth)) is future:
+                    del self.in_flight[key, depth]
+                self.condition.notify_all()
+
+    def _find_in_flight(self, key: str, depth: int) -> Optional[Future]:
+        for (fen, in_flight_depth), future in self.in_flight.items():
+            if fen == key and in_flight_depth >= depth and not future.cancelled():
+                return future
+        return None
+
+    def cancel_prefetch(self):
+        with self.condition:
+            for future in self.prefetches:
+                if future.cancel():
+                    self.in_flight = {key: value for key, value in self.in_flight.items() if value is not future}
+            self.prefetches = []
+            self.condition.notify_all()
+
+    def close(self):
+        self.cancel_prefetch()
+        self.prefetch_executor.shutdown(wait=False, cancel_futures=True)
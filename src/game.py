@@ -1,6 +1,7 @@
 import pygame
 from board import Board
 from const import ROWS, COLS, SQUARE_SIZE
+from coordinates import uci_to_row_col
 from dragger import Dragger
 from move import Move
 from pieces import Piece
@@ -60,13 +61,12 @@ class Game:
             for col in range(COLS):
                 square = self.board.grid.get_square_by_row_and_col(row, col)
                 if square.has_piece() and square.piece != self.dragger.piece:
-                    img = pygame.image.load(square.piece.asset)
+                    img = pygame.image.load(square.piece.get_asset())
                     img_center = (
                         col * SQUARE_SIZE + SQUARE_SIZE // 2,
                         row * SQUARE_SIZE + SQUARE_SIZE // 2,
                     )
-                    square.piece.texture_rect = img.get_rect(center=img_center)
-                    screen.blit(img, square.piece.texture_rect)
+                    screen.blit(img, img.get_rect(center=img_center))
 
     def show_last_move(self, screen):
         if len(self.board.moves) > 0:
@@ -108,11 +108,7 @@ class Game:
         check_color = (255, 180, 180)
         for color in ["white", "black"]:
             if self.board.is_king_in_check(color):
-                squares = []
-                for move in self.board.get_checks(color):
-                    squares += self.board.grid.get_squares_between(move)
-
-                for square in squares:
+                for square in self.board.get_check_squares(color):
                     rect = (
                         square.col * SQUARE_SIZE,
                         square.row * SQUARE_SIZE,
@@ -128,16 +124,13 @@ class Game:
     def show_ai_best_move(self, screen, best_move):
         if best_move:
             first_uci = best_move[:2]
-            second_uci = best_move[2:]
-            first_square = self.board.grid.get_square_by_uci(first_uci)
-            second_square = self.board.grid.get_square_by_uci(second_uci)
-            initial_row = first_square.row
-            initial_col = first_square.col
+            second_uci = best_move[2:4]
+            initial_row, initial_col = uci_to_row_col(first_uci, self.play_as_white)
+            second_row_col = uci_to_row_col(second_uci, self.play_as_white)
             color = (128, 0, 128)
             
-            if second_square:
-                target_row = second_square.row
-                target_col = second_square.col
+            if second_row_col:
+                target_row, target_col = second_row_col
                 target_rect = (
                 target_col * SQUARE_SIZE,
                 target_row * SQUARE_SIZE,
@@ -159,8 +152,13 @@ class Game:
             pygame.draw.rect(screen, color, initial_rect, width=10)
 
     def show_possible_moves(self, screen):
-        for move in self.board.possible_moves:
-            if move.piece == self.dragger.piece:
+        from_square = self.board.grid.get_square_by_piece(self.dragger.piece)
+        if from_square is None:
+            return
+
+        for (from_index, _), position_move in self.board.possible_moves.items():
+            if from_index == from_square.index:
+                move = self.board.grid.to_move(position_move)
                 center_x = move.target_col * SQUARE_SIZE + SQUARE_SIZE // 2
                 center_y = move.target_row * SQUARE_SIZE + SQUARE_SIZE // 2
                 radius = SQUARE_SIZE // 4
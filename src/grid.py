@@ -1,5 +1,7 @@
-import copy
+from typing import NamedTuple, Optional
 from const import COLS, ROWS
+from move import Move
+from pieces import Piece
 from pieces import Direction
 from pieces.bishop import BlackBishop, WhiteBishop
 from pieces.king import BlackKing, WhiteKing
@@ -8,44 +10,66 @@ from pieces.pawn import BlackPawn, WhitePawn
 from pieces.queen import BlackQueen, WhiteQueen
 from pieces.rook import BlackRook, WhiteRook
 from square import Square
-import chess
+from bitboard import BISHOP, KNIGHT, PIECE_NAMES, QUEEN, ROOK, STARTING_FEN, Position, PositionUndo, decode_move, encode_move
+from coordinates import SQUARE_INDICES, SQUARE_NAMES, square_index
+
+
+# Piece a pawn turns into, by promotion piece type and color
+PROMOTION_PIECES = {
+    (QUEEN, "white"): WhiteQueen,
+    (QUEEN, "black"): BlackQueen,
+    (ROOK, "white"): WhiteRook,
+    (ROOK, "black"): BlackRook,
+    (BISHOP, "white"): WhiteBishop,
+    (BISHOP, "black"): BlackBishop,
+    (KNIGHT, "white"): WhiteKnight,
+    (KNIGHT, "black"): BlackKnight,
+}
+
+
+class MoveUndo(NamedTuple):
+    move: Move
+    captured_square: Square
+    captured_piece: Optional[Piece]
+    rook_from_square: Optional[Square]
+    rook_to_square: Optional[Square]
+    position_undo: PositionUndo
+
 
 class Grid:
     def __init__(self, play_as_white):
         self.play_as_white = play_as_white
-        self.turn = "white"
         self.squares = [[None for _ in range(COLS)] for _ in range(ROWS)]
-        self.board = chess.Board()
+        self.squares_by_index = [None] * (ROWS * COLS)
+        # (color, piece name) -> squares holding such a piece, kept in sync by put_piece/take_piece
+        self.piece_squares = {}
         self._create()
-        self._add_uci_notations()
+        self._add_coordinates()
         self._add_pieces(play_as_white)
-        self.fen = self.board.fen()
-        self.moves = []
+        self._index_pieces()
+        # The authoritative game state; the squares are the view of it the UI draws
+        self.position = Position.from_fen(STARTING_FEN)
 
-    def get_last_move(self):
-        if len(self.moves) > 0:
-            return self.moves[-1]
-        return None
+    @property
+    def fen(self):
+        """
+        FEN of the current position, built on demand for the engine and the LLM.
+        """
+        return self.position.fen()
 
     def _create(self):
         for row in range(ROWS):
             for col in range(COLS):
                 self.squares[row][col] = Square(row, col)
 
-    def _add_uci_notations(self):
-        if self.play_as_white:
-            for row in range(ROWS):
-                for col in range(COLS):
-                    # UCI notation: Columns are letters ('a' to 'h') and rows are numbers ('1' to '8')
-                    file = chr(ord('a') + col)
-                    rank = str(ROWS - row)  # Flip row index to start from the bottom
-                    self.squares[row][col].uci = f"{file}{rank}"
-        else:
-            for row in range(ROWS):
-                for col in range(COLS):
-                    file = chr(ord('h') - col)
-                    rank = str(row + 1)
-                    self.squares[row][col].uci = f"{file}{rank}"
+    def _add_coordinates(self):
+        # Square index (a1 = 0, h8 = 63) and UCI name of every square, for this orientation
+        for row in range(ROWS):
+            for col in range(COLS):
+                square = self.squares[row][col]
+                square.index = square_index(row, col, self.play_as_white)
+                square.uci = SQUARE_NAMES[square.index]
+                self.squares_by_index[square.index] = square
 
     def _add_pieces(self, play_as_white):
         
@@ -122,78 +146,133 @@ class Grid:
             self.squares[0][3].piece = white_king
             self.squares[7][3].piece = black_king
 
-    def move_piece(self, move):
-        from_square = self.get_square_by_row_and_col(move.initial_row, move.initial_col)
-        to_square = self.get_square_by_row_and_col(move.target_row, move.target_col)
-        uci = f"{from_square.uci}{to_square.uci}"
-        chess_move = chess.Move.from_uci(uci)
-        if chess_move not in self.board.legal_moves:
-            print("Illegal move")
-            return
-        self.board.push(chess_move)
-        self.fen = self.board.fen()
-        
-        self.moves.append(move)
-
-        if move.en_passant:
-            opponent_row = move.target_row
-            opponent_col = move.target_col
+    def _index_pieces(self):
+        self.piece_squares = {}
+        for row in range(ROWS):
+            for col in range(COLS):
+                square = self.squares[row][col]
+                if square.piece:
+                    self.piece_squares.setdefault((square.piece.color, square.piece.name), []).append(square)
 
-            # The opponent's pawn is on the adjacent column, but we must remove it from the square it passed through
-            self.squares[opponent_row][
-                opponent_col
-            ].piece = None  # Remove the opponent's pawn
+    def put_piece(self, square, piece):
+        """
+        Place a piece (or None) on a square, keeping the piece index up to date.
+        """
+        if square.piece:
+            self.piece_squares[(square.piece.color, square.piece.name)].remove(square)
+        square.piece = piece
+        if piece:
+            self.piece_squares.setdefault((piece.color, piece.name), []).append(square)
 
-            # Step 2: Move the player's pawn to the target square
-            self.squares[move.target_row - move.piece.direction][
-                move.target_col
-            ].piece = None
-            self.squares[move.initial_row][move.initial_col].piece = None
-            self.squares[move.target_row][move.target_col].piece = move.piece
+    def take_piece(self, square):
+        piece = square.piece
+        if piece:
+            self.piece_squares[(piece.color, piece.name)].remove(square)
+            square.piece = None
+        return piece
 
-        elif move.is_castling:
-            # Move the King
-            king_target_col = move.target_col
-            king_target_row = move.target_row
+    def make_move(self, move):
+        """
+        Apply a move to the Position and to the squares and return an undo
+        token that unmake_move can use to restore the previous state.
+        """
+        from_square = self.squares[move.initial_row][move.initial_col]
+        to_square = self.squares[move.target_row][move.target_col]
+        captured_square = to_square
+        rook_from_square = None
+        rook_to_square = None
 
-            # Move the King to its new position (2 squares towards the Rook)
-            self.squares[king_target_row][king_target_col].piece = move.piece
-            self.squares[move.initial_row][move.initial_col].piece = None
+        position_move = self.to_position_move(move)
+        promotion = position_move >> 12 & 7
+        position_undo = self.position.make_move(position_move)
 
-            # Update the King's position (important for any future logic)
-            move.piece.row = king_target_row
-            move.piece.col = king_target_col
+        if move.en_passant:
+            # The captured pawn sits behind the target square, on the row the moving pawn came from
+            captured_square = self.squares[move.target_row - move.piece.direction][move.target_col]
 
+        elif move.is_castling:
             # Move the Rook (the Rook should move 1 square next to the King)
-            if king_target_col < move.initial_col:  # Rook is to the left of the King
-                rook_initial_col = 0  # Rook is initially in column 0
-                rook_target_col = (
-                    king_target_col + 1
-                )  # Rook moves to the right of the King
+            if move.target_col < move.initial_col:  # Rook is to the left of the King
+                rook_from_square = self.squares[move.initial_row][0]
+                rook_to_square = self.squares[move.target_row][move.target_col + 1]
             else:  # Rook is to the right of the King
-                rook_initial_col = 7  # Rook is initially in column 7
-                rook_target_col = (
-                    king_target_col - 1
-                )  # Rook moves to the left of the King
+                rook_from_square = self.squares[move.initial_row][COLS - 1]
+                rook_to_square = self.squares[move.target_row][move.target_col - 1]
 
-            # Move the Rook to the new position
-            rook_piece = self.squares[move.initial_row][rook_initial_col].piece
-            self.squares[king_target_row][rook_target_col].piece = rook_piece
-            self.squares[move.initial_row][rook_initial_col].piece = None
+        captured_piece = captured_square.piece
+        undo = MoveUndo(
+            move=move,
+            captured_square=captured_square,
+            captured_piece=captured_piece,
+            rook_from_square=rook_from_square,
+            rook_to_square=rook_to_square,
+            position_undo=position_undo,
+        )
 
-            # Update the Rook's position
-            rook_piece.row = king_target_row
-            rook_piece.col = rook_target_col
+        self.take_piece(captured_square)
+        self.take_piece(from_square)
+        self.put_piece(to_square, self._promoted_piece(move.piece, promotion) if promotion else move.piece)
+        if rook_from_square:
+            self.put_piece(rook_to_square, self.take_piece(rook_from_square))
+        return undo
+
+    def _promoted_piece(self, pawn, promotion):
+        # Numbered after the pieces of that kind already on the board, like the original ones
+        existing = self.piece_squares.get((pawn.color, PIECE_NAMES[promotion]), ())
+        return PROMOTION_PIECES[(promotion, pawn.color)](id=len(existing) + 1, direction=pawn.direction)
+
+    def unmake_move(self, undo):
+        """
+        Revert the move recorded in the undo token returned by make_move.
+        """
+        move = undo.move
+        self.position.unmake_move(undo.position_undo)
+
+        if undo.rook_from_square:
+            self.put_piece(undo.rook_from_square, self.take_piece(undo.rook_to_square))
+
+        self.take_piece(self.squares[move.target_row][move.target_col])
+        self.put_piece(self.squares[move.initial_row][move.initial_col], move.piece)
+        self.put_piece(undo.captured_square, undo.captured_piece)
+
+    def to_position_move(self, move):
+        """
+        Convert a Move into the packed move used by Position.
+        """
+        from_square = self.squares[move.initial_row][move.initial_col]
+        to_square = self.squares[move.target_row][move.target_col]
+        promotion = move.promotion or 0
+        if not promotion and move.piece.name == "Pawn" and move.target_row in (0, ROWS - 1):
+            # Pawns reaching the last row promote to a queen unless the move says otherwise
+            promotion = QUEEN
+        return encode_move(from_square.index, to_square.index, promotion, move.en_passant or move.is_castling)
+
+    def to_move(self, position_move):
+        """
+        Build the Move, with the pieces currently on the squares, for a Position move.
+        """
+        from_index, to_index, promotion = decode_move(position_move)
+        from_square = self.squares_by_index[from_index]
+        to_square = self.squares_by_index[to_index]
+        move = Move(
+            initial_row=from_square.row,
+            initial_col=from_square.col,
+            target_row=to_square.row,
+            target_col=to_square.col,
+            piece=from_square.piece,
+            captured_piece=to_square.piece,
+            promotion=promotion or None,
+        )
+
+        if self.position.is_en_passant(position_move):
+            move.en_passant = True
+            move.captured_piece = self.squares[move.target_row - move.piece.direction][move.target_col].piece
+        elif self.position.is_castling(position_move):
+            rook_index = from_index + 3 if to_index > from_index else from_index - 4
+            move.castling_square = self.squares_by_index[rook_index]
+
+        return move
 
-        else:
-            # Regular move (non-castling)
-            self.squares[move.target_row][move.target_col].piece = move.piece
-            self.squares[move.initial_row][move.initial_col].piece = None
-        
-        
-        
-        self.turn = "black" if self.turn == "white" else "white"
-        
     def get_squares_between(self, move):
         initial_square = self.get_square_by_row_and_col(
             move.initial_row, move.initial_col
@@ -215,26 +294,15 @@ class Grid:
         return squares_between
 
     def get_square_by_uci(self, uci):
-        for row in range(ROWS):
-            for col in range(COLS):
-                if self.squares[row][col].uci == uci:
-                    return self.squares[row][col]
+        index = SQUARE_INDICES.get(uci[:2])
+        return None if index is None else self.squares_by_index[index]
 
-    def get_squares_by_piece_name_and_color(self, name, color):
-        squares = []
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.squares[row][col].piece
-                if piece and piece.name == name and piece.color == color:
-                    squares.append(self.squares[row][col])
-        return squares
-
-    def get_square_by_piece_name_and_color(self, name, color):
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.squares[row][col].piece
-                if piece and piece.name == name and piece.color == color:
-                    return self.squares[row][col]
+    def get_square_by_piece(self, piece):
+        if piece is None:
+            return None
+        for square in self.piece_squares.get((piece.color, piece.name), ()):
+            if square.piece is piece:
+                return square
         return None
 
     def get_square_by_row_and_col(self, row, col):
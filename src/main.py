@@ -1,16 +1,21 @@
-import copy
 import time
 import pygame
 import sys
 
+from background import BackgroundTasks
+from bitboard import BISHOP, KNIGHT, PIECE_SYMBOLS, QUEEN, ROOK, Position
 from chatgpt import ChatGPT
 from const import COLS, PANEL_WIDTH, ROWS, WIDTH, HEIGHT, SQUARE_SIZE
+from coordinates import parse_uci_move
+from engine_broker import EngineBroker, play_uci
 from game import Game
 from minimax import Minimax
 from stockfish import Stockfish
 import os
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 ASSETS_DIR = os.path.join(CURRENT_DIR, "..","assets")
+ENEMY_RETRY_DELAY = 1  # seconds before asking again for an enemy move that failed, doubled on each failure
+ENEMY_RETRY_MAX_DELAY = 30
 
 class Main:
     def __init__(self):
@@ -24,7 +29,12 @@ class Main:
         self.dragger = None
         self.minimax = None
         self.stockfish = Stockfish()  # Initialize Stockfish
+        self.broker = EngineBroker(self.stockfish)
         self.chatgpt = ChatGPT()
+        # Engine and ChatGPT calls run in the background so that the window keeps responding.
+        # Two engine workers: a stale hint search is stopped by the next engine command
+        self.engine_tasks = BackgroundTasks(workers=2, name="engine")
+        self.llm_tasks = BackgroundTasks(workers=1, name="chatgpt")
         self.round = 1
         self.best_move = None
         self.modal_visible = True
@@ -32,6 +42,9 @@ class Main:
         self.ally_depth = 18
         self.enemy_depth = 5
         self.last_analysis = ""
+        self.engine_error = ""
+        self.enemy_failures = 0
+        self.enemy_retry_at = 0.0
         
 
     def initialize_game(self):
@@ -42,6 +55,15 @@ class Main:
         self.minimax = Minimax(self.board, max_depth=2)
         self.best_move = None
         self.round = 1
+        self.engine_error = ""
+        self.enemy_failures = 0
+        self.enemy_retry_at = 0.0
+        self.cancel_requests()
+
+    def cancel_requests(self):
+        self.broker.cancel_prefetch()
+        self.engine_tasks.cancel_all()
+        self.llm_tasks.cancel_all()
 
     def draw_modal(self):
         modal_width, modal_height = 400, 200
@@ -80,7 +102,14 @@ class Main:
     def draw_panel(self):
         panel_x = WIDTH
         pygame.draw.rect(self.screen, (230, 230, 230), (panel_x, 0, PANEL_WIDTH, HEIGHT))
-        
+        if self.engine_tasks.is_running() or self.llm_tasks.is_running():
+            font = pygame.font.SysFont("Arial", 16)
+            text = font.render("Thinking...", True, (100, 100, 100))
+            self.screen.blit(text, (panel_x + 20, HEIGHT - 30))
+        if self.engine_error:
+            font = pygame.font.SysFont("Arial", 14)
+            text = font.render(self.engine_error, True, (180, 30, 30))
+            self.screen.blit(text, (panel_x + 20, HEIGHT - 50))
        
     def draw_analysis_text(self, panel_x, start_y):
         font = pygame.font.SysFont("Arial", 14)
@@ -107,21 +136,105 @@ class Main:
             self.screen.blit(text_surface, (panel_x + margin, y_pos))
             y_pos += 18
 
-    def my_ai_move(self):
-        fen = self.grid.fen
-        self.best_move = self.stockfish.get_best_move(fen, self.ally_depth)
-        if self.best_move:
+    def wants_hint(self, moves_played):
+        return (moves_played // 2 ) >= self.ai_helps_after_round -1
+
+    def find_hint(self, fen):
+        # The engine ponders on the reply it expects, so the next hint starts from a warm search
+        return self.broker.get_best_move(fen, self.ally_depth, ponder=True)
+
+    def request_hint(self, fen, position_key):
+        """
+        Start the hint for a position in the background, followed by its ChatGPT explanation as soon as it is found.
+        """
+        future = self.engine_tasks.get("hint", position_key)
+        if future is None:
+            future = self.engine_tasks.request("hint", position_key, self.find_hint, fen)
+            future.add_done_callback(lambda hint: self.request_explanation(fen, position_key, hint))
+        return future
+
+    def request_explanation(self, fen, position_key, hint):
+        best_move = self.engine_tasks.result(hint)
+        if best_move and self.engine_tasks.get("hint", position_key) is hint:
             color = "white" if self.play_as_white else "black"
-            self.last_analysis = self.chatgpt.analyze_move(str(self.grid.board), color, self.best_move)
-            self.game.show_ai_best_move(self.screen, self.best_move)
-
-    def enemy_ai_move(self):
-        fen = self.grid.fen
-        best_move = self.stockfish.get_best_move(fen, self.enemy_depth)
-        if best_move:
-            from_square = self.grid.get_square_by_uci(best_move[:2])
-            to_square = self.grid.get_square_by_uci(best_move[2:])
-            self.board.move(to_square.row, to_square.col, from_square.piece)
+            board = str(Position.from_fen(fen))
+            self.llm_tasks.request("explanation", position_key, self.chatgpt.analyze_move, board, color, best_move)
+
+    def my_ai_move(self, position_key):
+        """
+        Show the hint once it is found, asking for it first unless it was started while the enemy moved.
+        """
+        # Build the FEN only when the hint has to be requested, not on every frame while it is pending
+        future = self.engine_tasks.get("hint", position_key) or self.request_hint(self.grid.fen, position_key)
+        if not future.done():
+            return
+
+        # An empty hint is not requested again for this position
+        self.best_move = self.engine_tasks.result(future) or ""
+        if self.best_move:
+            # While the user thinks, get the enemy reply and the next hint ready for their likely moves
+            self.broker.prefetch_replies(self.grid.fen, self.best_move, self.enemy_depth, self.ally_depth)
+
+    def update_analysis(self, position_key):
+        future = self.llm_tasks.get("explanation", position_key)
+        if future is not None and future.done():
+            self.llm_tasks.pop("explanation")
+            self.last_analysis = self.llm_tasks.result(future) or self.last_analysis
+
+    def enemy_ai_move(self, position_key):
+        """
+        Ask the engine for the enemy move in the background and play it once it arrives.
+        """
+        future = self.engine_tasks.get("enemy", position_key)
+        if future is None:
+            if time.monotonic() < self.enemy_retry_at:
+                return
+            future = self.engine_tasks.request("enemy", position_key, self.broker.get_best_move, self.grid.fen, self.enemy_depth)
+        if not future.done():
+            return
+
+        best_move = self.engine_tasks.result(future)
+        if not best_move:
+            # Failed or cancelled: drop it and ask again later, waiting longer after each failure
+            self.engine_tasks.pop("enemy")
+            delay = min(ENEMY_RETRY_DELAY * 2 ** self.enemy_failures, ENEMY_RETRY_MAX_DELAY)
+            self.enemy_failures += 1
+            self.enemy_retry_at = time.monotonic() + delay
+            self.engine_error = f"Engine failed, retrying in {delay}s"
+            return
+
+        self.enemy_failures = 0
+        self.engine_error = ""
+
+        if self.wants_hint(len(self.board.moves) + 1):
+            # Start the user's hint for the position after this move before it is played on the board
+            next_fen = play_uci(self.grid.fen, best_move)
+            self.request_hint(next_fen, Position.from_fen(next_fen).key)
+        from_index, to_index, promotion = parse_uci_move(best_move)
+        from_square = self.grid.squares_by_index[from_index]
+        to_square = self.grid.squares_by_index[to_index]
+        promotion = PIECE_SYMBOLS.index(promotion) if promotion else QUEEN
+        self.board.move(to_square.row, to_square.col, from_square.piece, promotion)
+
+    @staticmethod
+    def chosen_promotion():
+        """
+        Piece type a pawn dropped on the last row becomes: a queen, or a rook, bishop or
+        knight while R, B or N is held down.
+        """
+        pressed = pygame.key.get_pressed()
+        for key, piece_type in ((pygame.K_r, ROOK), (pygame.K_b, BISHOP), (pygame.K_n, KNIGHT)):
+            if pressed[key]:
+                return piece_type
+        return QUEEN
+
+    def quit(self):
+        self.engine_tasks.shutdown()
+        self.llm_tasks.shutdown()
+        self.broker.close()
+        self.stockfish.close()
+        pygame.quit()
+        sys.exit()
 
     def run(self):
         while True:
@@ -132,8 +245,7 @@ class Main:
 
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
-                        pygame.quit()
-                        sys.exit()
+                        self.quit()
 
                     elif event.type == pygame.MOUSEBUTTONDOWN:
                         mouse_x, mouse_y = event.pos
@@ -165,12 +277,19 @@ class Main:
                 self.game.show_possible_moves(self.screen)
                 self.game.show_uci(self.screen)
 
-                if self.best_move is None and self.board.turn == my_color:
-                    if (len(self.board.moves) // 2 ) >= self.ai_helps_after_round -1:
-                        self.my_ai_move()
-                if self.board.turn != my_color:
-                    self.enemy_ai_move()
-                    self.best_move = None
+                # Requests made for an earlier position are dropped as soon as a move is played
+                position_key = self.board.get_state()
+                self.engine_tasks.cancel_stale(position_key)
+                self.llm_tasks.cancel_stale(position_key)
+                self.update_analysis(position_key)
+
+                if not self.board.is_game_over:
+                    if self.best_move is None and self.board.turn == my_color:
+                        if self.wants_hint(len(self.board.moves)):
+                            self.my_ai_move(position_key)
+                    if self.board.turn != my_color:
+                        self.enemy_ai_move(position_key)
+                        self.best_move = None
 
                 if self.dragger.dragging:
                     self.dragger.update_blit(self.screen)
@@ -185,6 +304,7 @@ class Main:
                         # Check if reload button is clicked
                         if reload_button_rect.collidepoint(mouse_x, mouse_y):
                             self.modal_visible = True
+                            self.cancel_requests()
 
                     if event.type == pygame.MOUSEBUTTONDOWN:
                         mouse_x, mouse_y = event.pos
@@ -193,7 +313,8 @@ class Main:
                         square = self.grid.get_square_by_row_and_col(
                             clicked_row, clicked_col
                         )
-                        if not square.has_piece() or square.piece.color != self.board.turn:
+                        # The enemy moves in the background: its pieces are not the user's to drag
+                        if self.board.turn != my_color or not square.has_piece() or square.piece.color != my_color:
                             continue
 
                         self.dragger.update_mouse(event.pos)
@@ -233,15 +354,15 @@ class Main:
                         self.dragger.update_mouse(event.pos)
                         clicked_row = self.dragger.mouse_y // SQUARE_SIZE
                         clicked_col = self.dragger.mouse_x // SQUARE_SIZE
-                        self.board.move(clicked_row, clicked_col, self.dragger.piece)
+                        if self.dragger.dragging and self.board.turn == my_color:
+                            self.board.move(clicked_row, clicked_col, self.dragger.piece, self.chosen_promotion())
                         self.dragger.undrag_piece()
                         
                             
                         
 
                     elif event.type == pygame.QUIT:
-                        pygame.quit()
-                        sys.exit()
+                        self.quit()
 
                 pygame.display.update()
                 if self.board.is_game_over:
@@ -1,157 +1,435 @@
-from copy import deepcopy
-from typing import Optional
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError, wait
+from typing import Optional, Union
 from tqdm import tqdm
+from bitboard import BLACK, COLOR_NAMES, WHITE, Position
 from board import Board
-from const import COLS, ROWS
 from move import Move
-from functools import lru_cache  # Memoization decorator for caching
+from move_ordering import MoveOrderer
+from transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+# Depth cap for searches bounded by time or nodes instead of depth
+MAX_SEARCH_DEPTH = 64
+
+# Being mated scores -(MATE_SCORE - ply) from white's point of view, so that quicker mates score higher;
+# anything beyond MATE_THRESHOLD is a mate score
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000
+DRAW_SCORE = 0
+
+
+def _score_to_table(score, ply: int):
+    # Mate scores are stored relative to the node, so that they stay right when reached through another path
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_table(score, ply: int):
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class SearchAborted(Exception):
+    """
+    Raised inside the search when its time or node budget runs out or it is stopped.
+    """
+
+
+# Searcher of a worker process in a parallel root search, created by _init_worker
+_worker_minimax = None
+
+
+def _init_worker(hash_size_mb: int, stop_event):
+    global _worker_minimax
+    _worker_minimax = Minimax(position=Position(), hash_size_mb=hash_size_mb)
+    _worker_minimax.stop_event = stop_event
+
+
+def _search_root_move(fen: str, history, move, depth: int, maximizing: bool, alpha, beta, time_left, node_limit):
+    """
+    Search one root move in a worker process. The position travels as a FEN string plus the keys
+    of the earlier positions (for repetitions) rather than a pickled Board, and the worker keeps
+    its transposition table between calls.
+    """
+    minimax = _worker_minimax
+    minimax.position = Position.from_fen(fen)
+    minimax.position.history = list(history)
+    minimax.deadline = time.monotonic() + time_left if time_left is not None else None
+    minimax.node_limit = node_limit
+    minimax.nodes = 0
+    minimax.transposition_table.new_search()
+
+    minimax.position.make_move(move)
+    eval = minimax.minimax_with_board(minimax.position, depth - 1, maximizing, alpha, beta)
+    return eval, minimax.nodes
+
 
 class Minimax:
-    def __init__(self, board: Board, max_depth: int = 3):
+    """
+    Searches on the bitboard Position behind the board; the Grid and its
+    pieces are only touched to turn the chosen move back into a Move.
+    """
+
+    def __init__(
+        self,
+        board: Optional[Board] = None,
+        max_depth: int = 3,
+        hash_size_mb: int = 16,
+        workers: int = 1,
+        position: Optional[Position] = None,
+    ):
         self.board = board
+        self.position = board.grid.position if board else position
         self.max_depth = max_depth
-        self.transposition_table = {}  # Memoization table
+        self.hash_size_mb = hash_size_mb
+        self.transposition_table = TranspositionTable(hash_size_mb)
+        self.workers = workers
+        self.executor = None
+        # Cancellation handle for a running search; a process-shared event when the search runs in a pool
+        self.stop_event = multiprocessing.Event() if workers > 1 else threading.Event()
+        self.deadline = None
+        self.node_limit = None
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.iteration_nodes = []  # nodes searched by each completed iteration of iterative deepening
+        self.completed_depth = 0
+        self.move_orderer = MoveOrderer()
 
-    @lru_cache(maxsize=None)  # Caching evaluations
-    def evaluate_board(self, board: Board) -> int:
+    def evaluate_board(self, position: Position) -> int:
         """
-        Evaluate the current board state.
+        Evaluate the current board state in centipawns (material plus piece-square tables).
         Positive scores favor white, negative scores favor black.
+        The Position keeps this score up to date as moves are made and unmade.
         """
-        score = 0
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = board.grid.get_square_by_row_and_col(row, col)
-                if square.has_piece():
-                    piece = square.piece
-                    score += piece.value if piece.color == "white" else -piece.value
-        return score
+        return position.score
 
     def minimax(self, depth: int, maximizing: bool, alpha: int, beta: int) -> int:
         """
         Recursive minimax algorithm with alpha-beta pruning.
         """
-        if depth == 0 or self.is_game_over():
-            return self.evaluate_board(self.board)
-
-        color = "white" if maximizing else "black"
-        moves = self.board.get_possible_moves_by_color(color)
-
-        if maximizing:
-            max_eval = float('-inf')
-            # Prioritize most promising moves first (e.g., heuristic-based move ordering)
-            moves = self.order_moves(moves, maximizing)
-            for move in tqdm(moves, desc="Maximizing", leave=False):
-                temp_board = deepcopy(self.board)  # Avoid deepcopy
-                self.simulate_move(temp_board, move)
-                eval = self.minimax_with_board(temp_board, depth - 1, False, alpha, beta)
-                max_eval = max(max_eval, eval)
-                alpha = max(alpha, max_eval)
-                if beta <= alpha:
-                    break  # Beta pruning
-            return max_eval
-        else:
-            min_eval = float('inf')
-            # Prioritize most promising moves first (e.g., heuristic-based move ordering)
-            moves = self.order_moves(moves, maximizing)
-            for move in tqdm(moves, desc="Minimizing", leave=False):
-                temp_board = deepcopy(self.board)  # Avoid deepcopy
-                self.simulate_move(temp_board, move)
-                eval = self.minimax_with_board(temp_board, depth - 1, True, alpha, beta)
-                min_eval = min(min_eval, eval)
-                beta = min(beta, min_eval)
-                if beta <= alpha:
-                    break  # Alpha pruning
-            return min_eval
-
-    def find_best_move(self, color: str):
-        """
-        Find the best move for the given color using the minimax algorithm with alpha-beta pruning.
+        return self.minimax_with_board(self.position, depth, maximizing, alpha, beta, ply=0)
+
+    def find_best_move(
+        self, color: str, time_limit: Optional[float] = None, node_limit: Optional[int] = None
+    ) -> Optional[Union[Move, int]]:
+        """
+        Find the best move for the given color using iterative deepening minimax with alpha-beta pruning.
+        Without a budget the search goes to max_depth. With a time limit (seconds) and/or a node limit it
+        deepens until the budget runs out or stop() is called, and returns the best move of the deepest
+        completed iteration. The move is a Move of the board, or a packed Position move for a searcher
+        built from a bare Position.
+        """
+        moves = self.position.legal_moves(COLOR_NAMES.index(color))
+        if not moves:
+            return None
+
+        self.stop_event.clear()
+        self.deadline = time.monotonic() + time_limit if time_limit is not None else None
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.iteration_nodes = []
+        self.completed_depth = 0
+        self.transposition_table.new_search()
+        self.move_orderer.clear()
+        max_depth = self.max_depth if time_limit is None and node_limit is None else MAX_SEARCH_DEPTH
+
+        moves = self.move_orderer.order(self.position, moves)
+        best_move = moves[0]
+        try:
+            for depth in range(1, max_depth + 1):
+                nodes_before = self.nodes
+                if self.workers > 1 and depth > 1:
+                    best_move = self._search_root_parallel(moves, color, depth)
+                else:
+                    best_move = self._search_root(moves, color, depth)
+                self.completed_depth = depth
+                self.iteration_nodes.append(self.nodes - nodes_before)
+                # Search the previous iteration's best move first so the next one gets early cutoffs
+                moves.remove(best_move)
+                moves.insert(0, best_move)
+        except SearchAborted:
+            pass
+        finally:
+            self.deadline = None
+            self.node_limit = None
+
+        if self.board is None:
+            return best_move
+        return self.board.grid.to_move(best_move)
+
+    def search_stats(self) -> dict:
+        """
+        Node counts of the last find_best_move, per completed depth, with the effective branching
+        factor between iterations, so that move-ordering changes can be measured.
+        """
+        branching_factors = [
+            round(nodes / previous, 2)
+            for previous, nodes in zip(self.iteration_nodes, self.iteration_nodes[1:])
+            if previous
+        ]
+        return {
+            "depth": self.completed_depth,
+            "nodes": self.nodes,
+            "quiescence_nodes": self.quiescence_nodes,
+            "nodes_per_depth": dict(enumerate(self.iteration_nodes, start=1)),
+            "branching_factors": branching_factors,
+            "transposition_table": self.transposition_table.stats(),
+        }
+
+    def stop(self):
+        """
+        Ask a running find_best_move to return its best completed result; safe to call from another thread.
+        """
+        self.stop_event.set()
+
+    def close(self):
+        """
+        Shut down the worker processes of a parallel search.
         """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def _search_root(self, moves, color: str, depth: int):
         best_move = None
         best_value = float('-inf') if color == "white" else float('inf')
 
-        moves = self.board.get_possible_moves_by_color(color)
-        for move in tqdm(moves, desc="Evaluating moves", leave=False):
-            temp_board = deepcopy(self.board)  # Avoid deepcopy
-            self.simulate_move(temp_board, move)
-            eval = self.minimax_with_board(temp_board, self.max_depth - 1, color == "black", float('-inf'), float('inf'))
+        for move in tqdm(moves, desc=f"Evaluating moves (depth {depth})", leave=False):
+            undo = self.position.make_move(move)
+            try:
+                if color == "white":
+                    eval = self.minimax_with_board(self.position, depth - 1, False, best_value, float('inf'))
+                else:
+                    eval = self.minimax_with_board(self.position, depth - 1, True, float('-inf'), best_value)
+            finally:
+                self.position.unmake_move(undo)
 
-            if (color == "white" and eval > best_value) or (color == "black" and eval < best_value):
+            if best_move is None or (color == "white" and eval > best_value) or (color == "black" and eval < best_value):
                 best_value = eval
                 best_move = move
 
         return best_move
 
-    def minimax_with_board(self, board: Board, depth: int, maximizing: bool, alpha: int, beta: int) -> int:
-        """
-        A helper function to use a given board state for minimax evaluation with alpha-beta pruning.
-        """
-        # Check the transposition table first
-        board_state = board.get_state()  # Assume get_state() returns a hashable state
-        if board_state in self.transposition_table:
-            return self.transposition_table[board_state]
-
-        if depth == 0 or self.is_game_over():
-            eval = self.evaluate_board(board)
-            self.transposition_table[board_state] = eval
-            return eval
-
-        color = "white" if maximizing else "black"
-        moves = board.get_possible_moves_by_color(color)
-
-        if maximizing:
-            max_eval = float('-inf')
-            for move in tqdm(moves, desc="Maximizing", leave=False):
-                temp_board = deepcopy(board)  # Avoid deepcopy
-                self.simulate_move(temp_board, move)
-                eval = self.minimax_with_board(temp_board, depth - 1, False, alpha, beta)
-                max_eval = max(max_eval, eval)
-                alpha = max(alpha, max_eval)
-                if beta <= alpha:
-                    break  # Beta pruning
-            self.transposition_table[board_state] = max_eval
-            return max_eval
+    def _search_root_parallel(self, moves, color: str, depth: int):
+        """
+        Search the expected best move here, then split the other root moves across the worker pool
+        with its score as the bound. Only moves that beat it get an exact score, which is all the
+        root needs, so the chosen move is the same as with _search_root.
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self.hash_size_mb, self.stop_event)
+            )
+
+        maximizing = color == "black"  # the children are searched for the other side
+        best_move = moves[0]
+        undo = self.position.make_move(best_move)
+        try:
+            best_value = self.minimax_with_board(self.position, depth - 1, maximizing, float('-inf'), float('inf'))
+        finally:
+            self.position.unmake_move(undo)
+
+        if color == "white":
+            alpha, beta = best_value, float('inf')
         else:
-            min_eval = float('inf')
-            for move in tqdm(moves, desc="Minimizing", leave=False):
-                temp_board = deepcopy(board)  # Avoid deepcopy
-                self.simulate_move(temp_board, move)
-                eval = self.minimax_with_board(temp_board, depth - 1, True, alpha, beta)
-                min_eval = min(min_eval, eval)
-                beta = min(beta, min_eval)
-                if beta <= alpha:
-                    break  # Alpha pruning
-            self.transposition_table[board_state] = min_eval
-            return min_eval
-
-    def simulate_move(self, board: Board, move: Move):
-        """
-        Simulate a move on a given board.
-        """
-        board.grid.move_piece(move)
-        board.moves.append(move)
-        move.piece.add_move(move)
+            alpha, beta = float('-inf'), best_value
+        time_left = self.deadline - time.monotonic() if self.deadline is not None else None
+        # The remaining node budget is shared by the root moves, so the workers together stay within it
+        node_limit = None
+        if self.node_limit is not None:
+            node_limit = max(1, (self.node_limit - self.nodes) // max(1, len(moves) - 1))
+        fen = self.position.fen()
+        # Only positions since the last capture or pawn move can repeat
+        history = self.position.history[len(self.position.history) - self.position.halfmove_clock:]
+        futures = [
+            self.executor.submit(
+                _search_root_move, fen, history, move, depth, maximizing, alpha, beta, time_left, node_limit
+            )
+            for move in moves[1:]
+        ]
 
-    def is_game_over(self) -> bool:
+        try:
+            for move, future in zip(moves[1:], futures):
+                eval, nodes = self._wait_for(future)
+                self.nodes += nodes
+                if (color == "white" and eval > best_value) or (color == "black" and eval < best_value):
+                    best_value = eval
+                    best_move = move
+        except SearchAborted:
+            # Stop the moves being searched and drop the queued ones; wait for the pool to be idle so the
+            # next search does not clear the stop event while a worker is still on this one
+            self.stop_event.set()
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            raise
+
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted()
+        return best_move
+
+    def _wait_for(self, future):
+        while True:
+            if self.stop_event.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline):
+                raise SearchAborted()
+            try:
+                return future.result(timeout=0.05)
+            except FuturesTimeoutError:
+                continue
+
+    def _check_budget(self):
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted()
+        if self.nodes & 255 == 0 and (
+            self.stop_event.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline)
+        ):
+            raise SearchAborted()
+
+    def minimax_with_board(
+        self, position: Position, depth: int, maximizing: bool, alpha: int, beta: int, ply: int = 1
+    ) -> int:
+        """
+        A helper function to use a given position for minimax evaluation with alpha-beta pruning.
+        """
+        # Below the root, a position seen before on the path or in the game is scored as a draw:
+        # if repeating was best once it will be again
+        if ply and self.is_draw(position, repetitions=2):
+            return DRAW_SCORE
+
+        if depth <= 0:
+            return self.quiescence(position, maximizing, alpha, beta, ply)
+
+        self._check_budget()
+
+        # Check the transposition table first; only results searched at least as deep can be reused
+        board_state = position.key
+        entry = self.transposition_table.probe(board_state)
+        if entry and entry.depth >= depth:
+            score = _score_from_table(entry.score, ply)
+            if entry.flag == EXACT:
+                return score
+            if entry.flag == LOWER_BOUND:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if beta <= alpha:
+                return score
+
+        moves = position.legal_moves(WHITE if maximizing else BLACK)
+        if not moves:
+            return self.terminal_score(position, maximizing, ply)
+
+        moves = self.move_orderer.order(position, moves, entry.move if entry else None, ply)
+        original_alpha, original_beta = alpha, beta
+        best_move = None
+        best_eval = float('-inf') if maximizing else float('inf')
+        for move in moves:
+            undo = position.make_move(move)
+            try:
+                eval = self.minimax_with_board(position, depth - 1, not maximizing, alpha, beta, ply + 1)
+            finally:
+                position.unmake_move(undo)
+
+            if maximizing:
+                if eval > best_eval:
+                    best_eval, best_move = eval, move
+                alpha = max(alpha, best_eval)
+            else:
+                if eval < best_eval:
+                    best_eval, best_move = eval, move
+                beta = min(beta, best_eval)
+            if beta <= alpha:
+                # Alpha-beta cutoff; quiet moves that cause one are tried early in sibling positions
+                if self.move_orderer.is_quiet(position, move):
+                    self.move_orderer.record_cutoff(position, move, depth, ply)
+                break
+
+        if best_eval <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_eval >= original_beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.transposition_table.store(board_state, depth, _score_to_table(best_eval, ply), flag, best_move)
+        return best_eval
+
+    def quiescence(self, position: Position, maximizing: bool, alpha: int, beta: int, ply: int) -> int:
+        """
+        Keep searching captures and promotions past the depth limit until the position is quiet,
+        so that the search does not stop in the middle of an exchange (horizon effect).
+        The side to move may also "stand pat" on the static evaluation, except when in check,
+        where every evasion is searched.
         """
-        Check if the game is over (e.g., one of the kings is in checkmate).
+        self._check_budget()
+        self.quiescence_nodes += 1
+        color = WHITE if maximizing else BLACK
+
+        if position.is_check(color):
+            moves = position.legal_moves(color)
+            if not moves:
+                return self.terminal_score(position, maximizing, ply)
+            best_eval = float('-inf') if maximizing else float('inf')
+        else:
+            best_eval = self.evaluate_board(position)
+            if maximizing:
+                if best_eval >= beta:
+                    return best_eval
+                alpha = max(alpha, best_eval)
+            else:
+                if best_eval <= alpha:
+                    return best_eval
+                beta = min(beta, best_eval)
+            moves = position.legal_moves(color, captures_only=True)
+
+        for move in self.move_orderer.order(position, moves, ply=ply):
+            undo = position.make_move(move)
+            try:
+                eval = self.quiescence(position, not maximizing, alpha, beta, ply + 1)
+            finally:
+                position.unmake_move(undo)
+
+            if maximizing:
+                best_eval = max(best_eval, eval)
+                alpha = max(alpha, best_eval)
+            else:
+                best_eval = min(best_eval, eval)
+                beta = min(beta, best_eval)
+            if beta <= alpha:
+                break
+
+        return best_eval
+
+    def terminal_score(self, position: Position, maximizing: bool, ply: int) -> int:
         """
-        white_moves = self.board.get_possible_moves_by_color("white")
-        black_moves = self.board.get_possible_moves_by_color("black")
-        return not white_moves or not black_moves
+        Score of a position where the side to move has no legal move: mated, or stalemate.
+        """
+        if not position.is_check(WHITE if maximizing else BLACK):
+            return DRAW_SCORE
+        return -(MATE_SCORE - ply) if maximizing else MATE_SCORE - ply
 
-    def order_moves(self, moves, maximizing):
+    def is_draw(self, position: Position, repetitions: int = 3) -> bool:
         """
-        Order moves based on some heuristic (e.g., capturing pieces first).
-        This could be improved further by adding your own move-ordering logic.
+        Draw by the fifty-move rule, insufficient material or repetition of the position.
+        A checkmate on the move that reaches the fifty-move limit is still a checkmate.
         """
-        # For example, prioritize moves that capture pieces or other criteria
-        return sorted(moves, key=lambda move: self.evaluate_move(move), reverse=maximizing)
+        return (
+            (position.is_fifty_moves() and not (position.is_check() and not position.legal_moves()))
+            or position.is_insufficient_material()
+            or position.repetitions() >= repetitions
+        )
 
-    def evaluate_move(self, move: Move):
+    def is_game_over(self) -> bool:
         """
-        A simple heuristic to evaluate a move.
-        You can enhance this with more sophisticated criteria.
+        Check if the game is over: checkmate, stalemate or a draw.
         """
-        return move.piece.value if move.piece.color == "white" else -move.piece.value
\ No newline at end of file
+        return not self.position.legal_moves() or self.is_draw(self.position)
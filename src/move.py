@@ -2,6 +2,18 @@ from const import COLS, ROWS
 
 
 class Move:
+    __slots__ = (
+        "initial_row",
+        "initial_col",
+        "target_row",
+        "target_col",
+        "piece",
+        "captured_piece",
+        "promotion",
+        "castling_square",
+        "en_passant",
+    )
+
     def __init__(
         self,
         initial_row,
@@ -20,7 +32,7 @@ class Move:
         self.target_col = target_col
         self.piece = piece
         self.captured_piece = captured_piece
-        self.promotion = promotion
+        self.promotion = promotion  # piece type the pawn becomes (bitboard.QUEEN, ...), None otherwise
         self.castling_square = castling_square
         self.en_passant = en_passant
 
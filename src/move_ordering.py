@@ -0,0 +1,63 @@
+from typing import Iterable, List
+from bitboard import MOVE_SPECIAL, PAWN, Position
+from evaluation import MATERIAL
+
+MAX_PLY = 128
+
+# Sort keys: the table move first, then captures by MVV-LVA, promotions, killers and quiet moves by history
+TT_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 24
+PROMOTION_SCORE = 1 << 23
+KILLER_SCORE = 1 << 22
+
+
+class MoveOrderer:
+    """
+    Orders moves so that alpha-beta finds cutoffs early: the transposition-table move,
+    captures by most valuable victim / least valuable attacker, killer moves of the ply,
+    then quiet moves by their history score.
+    """
+
+    def __init__(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [[[0] * 64 for _ in range(64)] for _ in range(2)]  # history[color][from][to]
+
+    def clear(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [[[0] * 64 for _ in range(64)] for _ in range(2)]
+
+    def order(self, position: Position, moves: Iterable[int], tt_move=None, ply: int = 0) -> List[int]:
+        mailbox = position.mailbox
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        history = self.history[position.turn]
+
+        def score(move):
+            if move == tt_move:
+                return TT_MOVE_SCORE
+            from_square, to_square, promotion = move & 63, move >> 6 & 63, move >> 12 & 7
+            victim = mailbox[to_square] & 7
+            if not victim and move & MOVE_SPECIAL and mailbox[from_square] & 7 == PAWN:
+                victim = PAWN
+            if victim:
+                return CAPTURE_SCORE + MATERIAL[victim] * 8 - MATERIAL[mailbox[from_square] & 7] // 100 + MATERIAL[promotion]
+            if promotion:
+                return PROMOTION_SCORE + MATERIAL[promotion]
+            if move == killers[0] or move == killers[1]:
+                return KILLER_SCORE
+            return history[from_square][to_square]
+
+        return sorted(moves, key=score, reverse=True)
+
+    def is_quiet(self, position: Position, move) -> bool:
+        return not position.mailbox[move >> 6 & 63] and not move >> 12 & 7 and not position.is_en_passant(move)
+
+    def record_cutoff(self, position: Position, move, depth: int, ply: int):
+        """
+        Remember a quiet move that caused a beta cutoff, as a killer for the ply and in the history table.
+        """
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[position.turn][move & 63][move >> 6 & 63] += depth * depth
@@ -0,0 +1,129 @@
+import argparse
+import sys
+import time
+
+import chess
+
+from bitboard import Position
+from board import Board
+from coordinates import move_to_uci
+
+# Standard perft positions (https://www.chessprogramming.org/Perft_Results)
+POSITIONS = {
+    "startpos": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "kiwipete": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "en-passant": "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "promotions": "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "discovered-checks": "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    "symmetrical": "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+}
+
+
+def perft(position: Position, depth: int) -> int:
+    """
+    Count the leaf nodes of the legal move tree to the given depth; depth 0 is the position itself.
+    """
+    if depth <= 0:
+        return 1
+    moves = position.legal_moves()
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        undo = position.make_move(move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move(undo)
+    return nodes
+
+
+def divide(position: Position, depth: int) -> dict:
+    """
+    Perft split by root move, for finding which move a wrong count comes from.
+    """
+    counts = {}
+    if depth <= 0:
+        return counts
+    for move in position.legal_moves():
+        undo = position.make_move(move)
+        counts[move_to_uci(move)] = perft(position, depth - 1) if depth > 1 else 1
+        position.unmake_move(undo)
+    return counts
+
+
+def board_perft(board: Board, depth: int) -> int:
+    """
+    Perft through the UI-facing Board API (get_possible_moves_by_color and make/unmake_move).
+    """
+    if depth <= 0:
+        return 1
+    moves = board.get_possible_moves_by_color(board.turn)
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        undo = board.make_move(move)
+        nodes += board_perft(board, depth - 1)
+        board.unmake_move(undo)
+    return nodes
+
+
+def reference_perft(board: chess.Board, depth: int) -> int:
+    if depth <= 0:
+        return 1
+    if depth == 1:
+        return board.legal_moves.count()
+
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += reference_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def _report(name: str, depth: int, nodes: int, seconds: float, expected=None) -> bool:
+    nps = nodes / seconds if seconds else float("inf")
+    status = ""
+    if expected is not None:
+        status = "ok" if nodes == expected else f"MISMATCH (python-chess: {expected})"
+    print(f"{name:<20} depth {depth}  {nodes:>10} nodes  {seconds:8.2f}s  {nps:>10.0f} nps  {status}")
+    return expected is None or nodes == expected
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Perft correctness check and move generator benchmark.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--positions", nargs="*", choices=sorted(POSITIONS), default=sorted(POSITIONS))
+    parser.add_argument("--no-reference", action="store_true", help="skip the python-chess comparison")
+    parser.add_argument("--board", action="store_true", help="also run the start position through Board")
+    parser.add_argument("--divide", action="store_true", help="print the count of every root move")
+    args = parser.parse_args(argv)
+
+    ok = True
+    for name in args.positions:
+        fen = POSITIONS[name]
+        position = Position.from_fen(fen)
+        start = time.perf_counter()
+        nodes = perft(position, args.depth)
+        seconds = time.perf_counter() - start
+        expected = None if args.no_reference else reference_perft(chess.Board(fen), args.depth)
+        ok &= _report(name, args.depth, nodes, seconds, expected)
+        if args.divide:
+            for uci, count in sorted(divide(position, args.depth).items()):
+                print(f"    {uci}: {count}")
+
+    if args.board:
+        board = Board(play_as_white=True)
+        start = time.perf_counter()
+        nodes = board_perft(board, args.depth)
+        seconds = time.perf_counter() - start
+        expected = None if args.no_reference else reference_perft(chess.Board(), args.depth)
+        ok &= _report("startpos (Board)", args.depth, nodes, seconds, expected)
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
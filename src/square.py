@@ -2,11 +2,14 @@ from const import COLS, ROWS
 
 
 class Square:
+    __slots__ = ("row", "col", "piece", "uci", "index")
+
     def __init__(self, row, col, piece=None):
         self.row = row
         self.col = col
         self.piece = piece
         self.uci = None
+        self.index = None
 
     def is_empty(self):
         return self.piece is None
@@ -1,12 +1,385 @@
+import asyncio
+import os
+import random
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Optional
+
+import chess
+import chess.engine
+import httpx
 import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from analysis_cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES, AnalysisCache
+
+load_dotenv()
+# Engine settings, overridable from the .env file
+STOCKFISH_BACKEND = os.getenv("STOCKFISH_BACKEND", "local")  # "local" or "remote"
+STOCKFISH_PATH = os.getenv("STOCKFISH_PATH") or shutil.which("stockfish")
+STOCKFISH_HASH_MB = int(os.getenv("STOCKFISH_HASH_MB", "64"))
+STOCKFISH_THREADS = int(os.getenv("STOCKFISH_THREADS", "1"))
+STOCKFISH_PONDER = os.getenv("STOCKFISH_PONDER", "1") == "1"
+# Results are kept on disk between sessions; an empty STOCKFISH_CACHE_PATH turns the cache off
+STOCKFISH_CACHE_PATH = os.getenv("STOCKFISH_CACHE_PATH", DEFAULT_CACHE_PATH)
+STOCKFISH_CACHE_SIZE = int(os.getenv("STOCKFISH_CACHE_SIZE", str(DEFAULT_MAX_ENTRIES)))
+REMOTE_ENGINE_URL = "https://chess-api.com/v1"
+REMOTE_CONNECT_TIMEOUT = float(os.getenv("STOCKFISH_REMOTE_CONNECT_TIMEOUT", "5"))  # seconds
+REMOTE_READ_TIMEOUT = float(os.getenv("STOCKFISH_REMOTE_READ_TIMEOUT", "30"))  # seconds
+REMOTE_RETRIES = int(os.getenv("STOCKFISH_REMOTE_RETRIES", "2"))
+REMOTE_BACKOFF = 0.5  # seconds, doubled on every retry
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class EngineResult(NamedTuple):
+    move: Optional[str]  # best move in UCI notation, None when the side to move has no move
+    score: Optional[int]  # centipawns from white's point of view, None when unknown
+
+
+class Engine(ABC):
+    """
+    A chess engine that can be asked for the best move of a FEN position at a given depth.
+    """
+
+    concurrency = 1  # searches it can run at the same time
+    ponders = False  # whether it keeps searching the expected line after answering
+
+    @abstractmethod
+    def analyse(self, fen: str, depth: int, ponder: bool = False) -> EngineResult:
+        """
+        With ponder, an engine that can ponder goes on searching the position after the best move and
+        the reply it expects, until it is sent another command, so that search is warm in its hash table.
+        """
+        pass
+
+    def get_best_move(self, fen: str, depth: int, ponder: bool = False) -> Optional[str]:
+        return self.analyse(fen, depth, ponder).move
+
+    async def analyse_async(self, fen: str, depth: int) -> EngineResult:
+        return await asyncio.to_thread(self.analyse, fen, depth)
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+class LocalEngine(Engine):
+    """
+    A long-lived UCI engine process (Stockfish by default) driven through python-chess,
+    so a request costs only the search itself. Asked to ponder, it answers and then runs
+    "go ponder" on the reply it expects.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        hash_mb: int = STOCKFISH_HASH_MB,
+        threads: int = STOCKFISH_THREADS,
+        ponder: bool = STOCKFISH_PONDER,
+    ):
+        self.path = path or STOCKFISH_PATH
+        if not self.path:
+            raise FileNotFoundError("No UCI engine found: install stockfish or set STOCKFISH_PATH")
+        self.hash_mb = hash_mb
+        self.threads = threads
+        self.ponders = ponder
+        self.engine = None
+        self.lock = threading.Lock()  # searches can be requested from several threads
+
+    def _get_engine(self) -> chess.engine.SimpleEngine:
+        # Started on first use and then kept for the whole session
+        with self.lock:
+            if self.engine is None:
+                self.engine = chess.engine.SimpleEngine.popen_uci(self.path)
+                options = {"Hash": self.hash_mb, "Threads": self.threads}
+                self.engine.configure({name: value for name, value in options.items() if name in self.engine.options})
+            return self.engine
+
+    def _discard_engine(self, engine: chess.engine.SimpleEngine):
+        # The next request starts a new process, unless another thread already did
+        with self.lock:
+            if self.engine is engine:
+                self.engine = None
+
+    def analyse(self, fen: str, depth: int, ponder: bool = False) -> EngineResult:
+        board = chess.Board(fen)
+        engine = self._get_engine()
+        try:
+            return self._analyse(engine, board, depth, ponder)
+        except chess.engine.EngineTerminatedError:
+            # The process died (crashed or was killed): retry once with a fresh one
+            self._discard_engine(engine)
+            return self._analyse(self._get_engine(), board, depth, ponder)
+
+    def _analyse(self, engine: chess.engine.SimpleEngine, board: chess.Board, depth: int, ponder: bool) -> EngineResult:
+        if ponder and self.ponders and not board.is_game_over():
+            # python-chess sends "go ponder" on the position after the move and the expected reply
+            result = engine.play(
+                board, chess.engine.Limit(depth=depth), info=chess.engine.INFO_SCORE | chess.engine.INFO_PV, ponder=True
+            )
+            info = dict(result.info, pv=[result.move])
+        else:
+            info = engine.analyse(board, chess.engine.Limit(depth=depth))
+        pv = info.get("pv")
+        score = info.get("score")
+        return EngineResult(
+            move=pv[0].uci() if pv else None,
+            score=score.white().score(mate_score=100000) if score is not None else None,
+        )
+
+    def close(self):
+        with self.lock:
+            if self.engine is not None:
+                self.engine.quit()
+                self.engine = None
+
+
+class RemoteEngineError(Exception):
+    """
+    The remote engine could not answer, after retrying, or is considered down by the circuit breaker.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service: after failure_threshold consecutive failures the circuit
+    opens and calls are refused for reset_timeout seconds; then one trial call is let through,
+    which closes the circuit again if it succeeds. Other calls are refused until the trial ends.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_in_flight or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            # Half open: only this call goes through, and its failure opens the circuit again
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+
+class RemoteEngine(Engine):
+    """
+    Stockfish behind the chess-api.com HTTP API; needs no local binary but pays a network round trip per move.
+    Connections are pooled and kept alive, failed calls are retried with jittered backoff, and while the API
+    keeps failing the fallback engine (the local one, when there is a binary) answers instead.
+    """
+
+    def __init__(self, url: str = REMOTE_ENGINE_URL, fallback: Optional[Engine] = None, retries: int = REMOTE_RETRIES):
+        self.url = url
+        self.fallback = fallback
+        self.retries = retries
+        self.timeout = (REMOTE_CONNECT_TIMEOUT, REMOTE_READ_TIMEOUT)
+        self.breaker = CircuitBreaker()
+        self.concurrency = 4
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency))
+        self.async_client: Optional[httpx.AsyncClient] = None
+
+    def analyse(self, fen: str, depth: int, ponder: bool = False) -> EngineResult:
+        try:
+            return self._request(fen, depth)
+        except RemoteEngineError as error:
+            if self.fallback is None:
+                raise
+            print(f"{error}, using the local engine")
+            return self.fallback.analyse(fen, depth, ponder)
+
+    async def analyse_async(self, fen: str, depth: int) -> EngineResult:
+        """
+        Same as analyse, but without blocking the event loop, so several positions can be requested at once.
+        """
+        try:
+            return await self._request_async(fen, depth)
+        except RemoteEngineError as error:
+            if self.fallback is None:
+                raise
+            print(f"{error}, using the local engine")
+            return await self.fallback.analyse_async(fen, depth)
+
+    def _request(self, fen: str, depth: int) -> EngineResult:
+        if not self.breaker.allow():
+            raise RemoteEngineError("Remote engine unavailable")
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(self.url, json={"fen": fen, "depth": depth}, timeout=self.timeout)
+                if response.status_code in RETRY_STATUS_CODES:
+                    error = f"status {response.status_code}"
+                else:
+                    response.raise_for_status()
+                    result = self._parse(response.json())
+                    self.breaker.record_success()
+                    return result
+            except (requests.ConnectionError, requests.Timeout) as exception:
+                error = repr(exception)
+            except (requests.RequestException, ValueError) as exception:
+                # A client error or a malformed answer: retrying would not help
+                self.breaker.record_failure()
+                raise RemoteEngineError(f"Remote engine failed ({exception!r})") from exception
+            if attempt < self.retries:
+                time.sleep(self._backoff(attempt))
+
+        self.breaker.record_failure()
+        raise RemoteEngineError(f"Remote engine failed after {self.retries + 1} attempts ({error})")
+
+    async def _request_async(self, fen: str, depth: int) -> EngineResult:
+        if not self.breaker.allow():
+            raise RemoteEngineError("Remote engine unavailable")
+        if self.async_client is None:
+            timeout = httpx.Timeout(REMOTE_READ_TIMEOUT, connect=REMOTE_CONNECT_TIMEOUT)
+            limits = httpx.Limits(max_keepalive_connections=self.concurrency)
+            self.async_client = httpx.AsyncClient(timeout=timeout, limits=limits)
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.async_client.post(self.url, json={"fen": fen, "depth": depth})
+                if response.status_code in RETRY_STATUS_CODES:
+                    error = f"status {response.status_code}"
+                else:
+                    response.raise_for_status()
+                    result = self._parse(response.json())
+                    self.breaker.record_success()
+                    return result
+            except httpx.TransportError as exception:
+                error = repr(exception)
+            except (httpx.HTTPError, ValueError) as exception:
+                # A client error or a malformed answer: retrying would not help
+                self.breaker.record_failure()
+                raise RemoteEngineError(f"Remote engine failed ({exception!r})") from exception
+            if attempt < self.retries:
+                await asyncio.sleep(self._backoff(attempt))
+
+        self.breaker.record_failure()
+        raise RemoteEngineError(f"Remote engine failed after {self.retries + 1} attempts ({error})")
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # Full jitter, so that retries from several requests do not hit the API at the same moment
+        return random.uniform(0, REMOTE_BACKOFF * 2**attempt)
+
+    @staticmethod
+    def _parse(json_response) -> EngineResult:
+        # Raises ValueError for an answer of the wrong shape, so that it counts as a failure of the API
+        if not isinstance(json_response, dict):
+            raise ValueError(f"Unexpected remote engine answer: {json_response!r}")
+        move = json_response.get("move")
+        centipawns = json_response.get("centipawns")
+        if move is not None and not isinstance(move, str):
+            raise ValueError(f"Unexpected remote engine move: {move!r}")
+        try:
+            score = int(centipawns) if centipawns is not None else None
+        except TypeError as exception:
+            raise ValueError(f"Unexpected remote engine score: {centipawns!r}") from exception
+        return EngineResult(move=move, score=score)
+
+    def close(self):
+        self.session.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+    async def aclose(self):
+        if self.async_client is not None:
+            await self.async_client.aclose()
+            self.async_client = None
 
 
 class Stockfish:
-  
-  def get_best_move(self, fen, depth):
-    url = "https://chess-api.com/v1"
-    payload = {"fen": fen, "depth": depth}
-    response = requests.request("POST", url, json=payload)
-    json_response = response.json()
-    return json_response["move"]
- 
\ No newline at end of file
+    """
+    The engine the game talks to. Uses a local Stockfish process unless the remote
+    backend is chosen (or no local binary can be found). Results are looked up in the
+    analysis cache first, so positions seen in earlier sessions cost no engine time.
+    """
+
+    def __init__(self, backend: Optional[str] = None, engine: Optional[Engine] = None, cache: Optional[AnalysisCache] = None):
+        self.engine = engine or self._create_engine(backend or STOCKFISH_BACKEND)
+        self.cache = cache or self._create_cache()
+
+    @staticmethod
+    def _create_engine(backend: str) -> Engine:
+        if backend == "remote":
+            return RemoteEngine(fallback=LocalEngine() if STOCKFISH_PATH else None)
+        if backend != "local":
+            raise ValueError(f"Unknown engine backend: {backend}")
+        if not STOCKFISH_PATH:
+            print("Stockfish not found, using the remote engine API")
+            return RemoteEngine()
+        return LocalEngine()
+
+    @property
+    def concurrency(self) -> int:
+        return self.engine.concurrency
+
+    @property
+    def ponders(self) -> bool:
+        return self.engine.ponders
+
+    @staticmethod
+    def _create_cache() -> Optional[AnalysisCache]:
+        if not STOCKFISH_CACHE_PATH:
+            return None
+        return AnalysisCache(STOCKFISH_CACHE_PATH, STOCKFISH_CACHE_SIZE)
+
+    def analyse(self, fen: str, depth: int, ponder: bool = False) -> EngineResult:
+        if self.cache is None:
+            return self.engine.analyse(fen, depth, ponder)
+
+        cached = self.cache.get(fen, depth)
+        if cached is not None:
+            return EngineResult(*cached)
+
+        result = self.engine.analyse(fen, depth, ponder)
+        if result.move:
+            self.cache.put(fen, depth, result.move, result.score)
+        return result
+
+    async def analyse_async(self, fen: str, depth: int) -> EngineResult:
+        if self.cache is None:
+            return await self.engine.analyse_async(fen, depth)
+
+        cached = self.cache.get(fen, depth)
+        if cached is not None:
+            return EngineResult(*cached)
+
+        result = await self.engine.analyse_async(fen, depth)
+        if result.move:
+            self.cache.put(fen, depth, result.move, result.score)
+        return result
+
+    def get_best_move(self, fen: str, depth: int, ponder: bool = False) -> Optional[str]:
+        return self.analyse(fen, depth, ponder).move
+
+    async def aclose(self):
+        await self.engine.aclose()
+
+    def close(self):
+        self.engine.close()
+        if self.cache is not None:
+            print(f"Analysis cache: {self.cache.stats()}")
+            self.cache.close()
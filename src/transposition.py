@@ -0,0 +1,93 @@
+from typing import NamedTuple, Optional
+
+EXACT = 0
+LOWER_BOUND = 1  # the score is at least this (the search failed high)
+UPPER_BOUND = 2  # the score is at most this (the search failed low)
+
+# Rough size of one stored entry in CPython: the tuple, its 64-bit key and its slot in the list
+ENTRY_BYTES = 160
+
+
+class TTEntry(NamedTuple):
+    key: int
+    depth: int
+    score: float
+    flag: int
+    move: Optional[int]  # packed move, see bitboard.encode_move
+    generation: int
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table keyed by Zobrist hash.
+    Every bucket has a depth-preferred slot and an always-replace slot, so deep
+    results survive while shallow ones still get cached.
+    """
+
+    def __init__(self, size_mb: int = 16):
+        buckets = max(1, size_mb * 1024 * 1024 // (2 * ENTRY_BYTES))
+        self.buckets = 1 << (buckets.bit_length() - 1)  # power of two so that the index is a mask
+        self.mask = self.buckets - 1
+        self.slots = [None] * (2 * self.buckets)
+        self.generation = 0
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.replacements = 0
+
+    def new_search(self):
+        """
+        Start a new search: entries from older searches become the first to be replaced.
+        """
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * (2 * self.buckets)
+        self.generation = 0
+        self.used = 0
+        self.hits = self.misses = self.collisions = self.replacements = 0
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        index = (key & self.mask) << 1
+        for entry in (self.slots[index], self.slots[index + 1]):
+            if entry is not None and entry.key == key:
+                self.hits += 1
+                return entry
+
+        self.misses += 1
+        if self.slots[index] is not None or self.slots[index + 1] is not None:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, depth: int, score: float, flag: int, move=None):
+        index = (key & self.mask) << 1
+        entry = TTEntry(key, depth, score, flag, move, self.generation)
+        deep = self.slots[index]
+
+        if deep is None or deep.key == key or depth >= deep.depth or deep.generation != self.generation:
+            if deep is not None and deep.key != key:
+                # The displaced entry gets a second life in the always-replace slot
+                self._put(index + 1, deep)
+            self._put(index, entry)
+        else:
+            self._put(index + 1, entry)
+
+    def _put(self, index: int, entry: TTEntry):
+        current = self.slots[index]
+        if current is None:
+            self.used += 1
+        elif current.key != entry.key:
+            self.replacements += 1
+        self.slots[index] = entry
+
+    def stats(self) -> dict:
+        probes = self.hits + self.misses
+        return {
+            "probes": probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / probes if probes else 0.0,
+            "collisions": self.collisions,
+            "replacements": self.replacements,
+            "fill": self.used / len(self.slots),
+        }
@@ -0,0 +1,15 @@
+import random
+
+# Fixed seed so that keys are stable between runs and processes
+_random = random.Random(0x5EED)
+
+
+def _key() -> int:
+    return _random.getrandbits(64)
+
+
+# PIECE_KEYS[piece_code][square], piece_code being piece_type | color << 3 as in the Position mailbox
+PIECE_KEYS = [[_key() for _ in range(64)] for _ in range(16)]
+CASTLING_KEYS = [_key() for _ in range(16)]
+EP_FILE_KEYS = [_key() for _ in range(8)]
+BLACK_TO_MOVE_KEY = _key()